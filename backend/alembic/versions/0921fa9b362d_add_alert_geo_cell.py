@@ -0,0 +1,68 @@
+"""add alert geo cell
+
+Grid cell column backing radius queries on alerts, backfilled from
+latitude/longitude.
+
+Revision ID: 0921fa9b362d
+Revises: 32f647a31252
+Create Date: 2026-10-17 00:04:36.669679
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0921fa9b362d'
+down_revision: Union[str, None] = '32f647a31252'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Grid as of this revision; copied so later changes to app.geo cannot change the backfill
+CELL_DEG = 0.01
+LON_CELLS = 36000
+
+
+def cell_for(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    lat_index = int(math.floor((min(max(latitude, -90.0), 90.0) + 90.0) / CELL_DEG))
+    lon_index = min(int(math.floor((min(max(longitude, -180.0), 180.0) + 180.0) / CELL_DEG)), LON_CELLS - 1)
+    return lat_index * LON_CELLS + lon_index
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "geo_cell" not in {column["name"] for column in inspector.get_columns("alerts")}:
+        op.add_column("alerts", sa.Column("geo_cell", sa.Integer()))
+    if "ix_alerts_geo_cell" not in {index["name"] for index in inspector.get_indexes("alerts")}:
+        op.create_index("ix_alerts_geo_cell", "alerts", ["geo_cell"])
+
+    alerts = sa.table(
+        "alerts",
+        sa.column("id", sa.Integer),
+        sa.column("latitude", sa.Float),
+        sa.column("longitude", sa.Float),
+        sa.column("geo_cell", sa.Integer),
+    )
+    rows = bind.execute(
+        sa.select(alerts.c.id, alerts.c.latitude, alerts.c.longitude).where(
+            alerts.c.latitude.isnot(None), alerts.c.longitude.isnot(None)
+        )
+    ).fetchall()
+    if rows:
+        bind.execute(
+            alerts.update().where(alerts.c.id == sa.bindparam("b_id")).values(geo_cell=sa.bindparam("b_cell")),
+            [{"b_id": row.id, "b_cell": cell_for(row.latitude, row.longitude)} for row in rows],
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_alerts_geo_cell", table_name="alerts")
+    with op.batch_alter_table("alerts") as batch_op:
+        batch_op.drop_column("geo_cell")
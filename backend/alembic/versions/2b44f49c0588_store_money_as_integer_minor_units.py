@@ -0,0 +1,112 @@
+"""store money as integer minor units
+
+Replaces the Float money columns of expenses, splits and the balance ledger
+with integer cents. Equal splits whose rounded shares no longer add up to the
+expense total get the leftover cents spread over their first open splits, and
+the ledger is rebuilt from the converted splits.
+
+Revision ID: 2b44f49c0588
+Revises: 8b5d370f4eca
+Create Date: 2026-10-17 00:20:45.157192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b44f49c0588'
+down_revision: Union[str, None] = '8b5d370f4eca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table: [(float column, cents column, whether the float column was nullable)]
+MONEY_COLUMNS = {
+    "expenses": [("total_amount", "total_amount_cents", False)],
+    "expense_splits": [("amount_owed", "amount_owed_cents", False), ("amount_paid", "amount_paid_cents", True)],
+    "user_balances": [("owes", "owes_cents", False), ("owed", "owed_cents", False)],
+    "pair_balances": [("amount", "amount_cents", False)],
+}
+
+# Ledger backfill in cents as of this revision, frozen as SQL so later changes
+# to app.ledger cannot break it
+FILL_PAIR_BALANCES = sa.text(
+    "INSERT INTO pair_balances (debtor_id, creditor_id, amount_cents, updated_at) "
+    "SELECT s.user_id, e.created_by_id, SUM(s.amount_owed_cents - COALESCE(s.amount_paid_cents, 0)), CURRENT_TIMESTAMP "
+    "FROM expense_splits s JOIN expenses e ON e.id = s.expense_id "
+    "WHERE s.is_settled = :unsettled AND s.user_id != e.created_by_id "
+    "GROUP BY s.user_id, e.created_by_id"
+).bindparams(unsettled=False)
+FILL_USER_BALANCES = sa.text(
+    "INSERT INTO user_balances (user_id, owes_cents, owed_cents, updated_at) "
+    "SELECT user_id, SUM(owes), SUM(owed), CURRENT_TIMESTAMP FROM ("
+    "SELECT debtor_id AS user_id, amount_cents AS owes, 0 AS owed FROM pair_balances "
+    "UNION ALL SELECT creditor_id, 0, amount_cents FROM pair_balances"
+    ") AS per_user GROUP BY user_id"
+)
+
+
+def _convert(table, to_cents):
+    """Swap one side of each column pair for the other, copying values across."""
+    bind = op.get_bind()
+    existing = {column["name"] for column in sa.inspect(bind).get_columns(table)}
+    pairs = [
+        (float_column, cents_column, nullable) if to_cents else (cents_column, float_column, nullable)
+        for float_column, cents_column, nullable in MONEY_COLUMNS[table]
+    ]
+    pairs = [pair for pair in pairs if pair[0] in existing and pair[1] not in existing]
+    if not pairs:
+        return
+    new_type = sa.Integer() if to_cents else sa.Float()
+    with op.batch_alter_table(table) as batch_op:
+        for _, new, _ in pairs:
+            batch_op.add_column(sa.Column(new, new_type))
+    for old, new, _ in pairs:
+        value = f"CAST(ROUND({old} * 100) AS INTEGER)" if to_cents else f"{old} / 100.0"
+        op.execute(f"UPDATE {table} SET {new} = COALESCE({value}, 0)")
+    with op.batch_alter_table(table) as batch_op:
+        for old, new, nullable in pairs:
+            batch_op.alter_column(new, existing_type=new_type, nullable=nullable and not to_cents)
+            batch_op.drop_column(old)
+
+
+def _fix_equal_split_remainders():
+    bind = op.get_bind()
+    expenses = bind.execute(sa.text(
+        "SELECT e.id, e.total_amount_cents - SUM(s.amount_owed_cents) AS leftover "
+        "FROM expenses e JOIN expense_splits s ON s.expense_id = e.id "
+        "WHERE e.split_type = 'equal' GROUP BY e.id, e.total_amount_cents "
+        "HAVING e.total_amount_cents != SUM(s.amount_owed_cents)"
+    )).fetchall()
+    for expense_id, leftover in expenses:
+        open_splits = bind.execute(sa.text(
+            "SELECT id FROM expense_splits WHERE expense_id = :expense_id "
+            "AND (is_settled IS NULL OR is_settled = 0) ORDER BY id"
+        ), {"expense_id": expense_id}).scalars().all()
+        # Only float rounding noise is corrected, one cent per split at most
+        if abs(leftover) > len(open_splits):
+            continue
+        step = 1 if leftover > 0 else -1
+        for split_id in open_splits[:abs(leftover)]:
+            bind.execute(sa.text(
+                "UPDATE expense_splits SET amount_owed_cents = amount_owed_cents + :step WHERE id = :split_id"
+            ), {"step": step, "split_id": split_id})
+
+
+def upgrade() -> None:
+    for table in MONEY_COLUMNS:
+        _convert(table, to_cents=True)
+    _fix_equal_split_remainders()
+    op.execute("DELETE FROM pair_balances")
+    op.execute("DELETE FROM user_balances")
+    bind = op.get_bind()
+    bind.execute(FILL_PAIR_BALANCES)
+    bind.execute(FILL_USER_BALANCES)
+
+
+def downgrade() -> None:
+    for table in MONEY_COLUMNS:
+        _convert(table, to_cents=False)
@@ -0,0 +1,43 @@
+"""add idea votes
+
+Per-user vote records backing idempotent voting on ideas.
+
+Revision ID: 32f647a31252
+Revises: 49454df5c098
+Create Date: 2026-10-17 00:00:44.117699
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '32f647a31252'
+down_revision: Union[str, None] = '49454df5c098'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("idea_votes"):
+        return
+    op.create_table(
+        "idea_votes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("idea_id", sa.Integer(), sa.ForeignKey("ideas.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("vote_type", sa.String(length=10), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.UniqueConstraint("idea_id", "user_id", name="uq_idea_votes_idea_id_user_id"),
+    )
+    op.create_index("ix_idea_votes_id", "idea_votes", ["id"])
+    op.create_index("ix_idea_votes_user_id", "idea_votes", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idea_votes_user_id", table_name="idea_votes")
+    op.drop_index("ix_idea_votes_id", table_name="idea_votes")
+    op.drop_table("idea_votes")
@@ -0,0 +1,66 @@
+"""add query indexes
+
+Composite indexes matching the filter + (created_at, id) ordering used by
+each list endpoint, plus foreign-key indexes for joins and eager loads.
+
+Revision ID: 49454df5c098
+Revises: 
+Create Date: 2026-10-16 23:59:37.576198
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '49454df5c098'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ("ix_users_created_at_id", "users", ["created_at", "id"]),
+    ("ix_ideas_created_at_id", "ideas", ["created_at", "id"]),
+    ("ix_ideas_category_created_at_id", "ideas", ["category", "created_at", "id"]),
+    ("ix_ideas_status_created_at_id", "ideas", ["status", "created_at", "id"]),
+    ("ix_ideas_author_id", "ideas", ["author_id"]),
+    ("ix_alerts_created_at_id", "alerts", ["created_at", "id"]),
+    ("ix_alerts_status_created_at_id", "alerts", ["status", "created_at", "id"]),
+    ("ix_alerts_severity_created_at_id", "alerts", ["severity", "created_at", "id"]),
+    ("ix_alerts_alert_type_created_at_id", "alerts", ["alert_type", "created_at", "id"]),
+    ("ix_alerts_author_id", "alerts", ["author_id"]),
+    ("ix_marketplace_items_created_at_id", "marketplace_items", ["created_at", "id"]),
+    ("ix_marketplace_items_availability_created_at_id", "marketplace_items", ["availability", "created_at", "id"]),
+    ("ix_marketplace_items_category_created_at_id", "marketplace_items", ["category", "created_at", "id"]),
+    ("ix_marketplace_items_owner_id_created_at_id", "marketplace_items", ["owner_id", "created_at", "id"]),
+    ("ix_marketplace_items_current_borrower_id_availability", "marketplace_items", ["current_borrower_id", "availability"]),
+    ("ix_expenses_created_at_id", "expenses", ["created_at", "id"]),
+    ("ix_expenses_category_created_at_id", "expenses", ["category", "created_at", "id"]),
+    ("ix_expenses_status_created_at_id", "expenses", ["status", "created_at", "id"]),
+    ("ix_expenses_created_by_id_created_at_id", "expenses", ["created_by_id", "created_at", "id"]),
+    ("ix_expense_splits_expense_id_user_id", "expense_splits", ["expense_id", "user_id"]),
+    ("ix_expense_splits_user_id_is_settled", "expense_splits", ["user_id", "is_settled"]),
+    ("ix_expense_participants_expense_id_user_id", "expense_participants", ["expense_id", "user_id"]),
+    ("ix_expense_participants_user_id_expense_id", "expense_participants", ["user_id", "expense_id"]),
+]
+
+
+def _existing_indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    # Databases created by create_all on a newer model already have these
+    for name, table, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,50 @@
+"""add reservations
+
+Booking calendar for marketplace items, seeded with the loans that are
+currently out.
+
+Revision ID: 57903c5cf821
+Revises: 2b44f49c0588
+Create Date: 2026-10-17 00:24:45.242585
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '57903c5cf821'
+down_revision: Union[str, None] = '2b44f49c0588'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("reservations"):
+        return
+    op.create_table(
+        "reservations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("marketplace_items.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("starts_at", sa.DateTime(), nullable=False),
+        sa.Column("ends_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index(
+        "ix_reservations_item_id_starts_at_ends_at", "reservations", ["item_id", "starts_at", "ends_at"]
+    )
+    op.create_index("ix_reservations_user_id_starts_at", "reservations", ["user_id", "starts_at"])
+    op.execute(
+        "INSERT INTO reservations (item_id, user_id, starts_at, ends_at, created_at) "
+        "SELECT id, current_borrower_id, borrowed_at, return_by, borrowed_at FROM marketplace_items "
+        "WHERE current_borrower_id IS NOT NULL AND borrowed_at IS NOT NULL AND return_by IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_user_id_starts_at", table_name="reservations")
+    op.drop_index("ix_reservations_item_id_starts_at_ends_at", table_name="reservations")
+    op.drop_table("reservations")
@@ -0,0 +1,75 @@
+"""add expense ledger
+
+Per-user and per-pair balance tables, filled from the splits that are still
+unsettled.
+
+Revision ID: 8b5d370f4eca
+Revises: bd5c097f08b5
+Create Date: 2026-10-17 00:18:12.444735
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5d370f4eca'
+down_revision: Union[str, None] = 'bd5c097f08b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Ledger backfill as of this revision (Float amounts), frozen as SQL so later
+# changes to app.ledger cannot break it
+FILL_PAIR_BALANCES = sa.text(
+    "INSERT INTO pair_balances (debtor_id, creditor_id, amount, updated_at) "
+    "SELECT s.user_id, e.created_by_id, SUM(s.amount_owed - COALESCE(s.amount_paid, 0.0)), CURRENT_TIMESTAMP "
+    "FROM expense_splits s JOIN expenses e ON e.id = s.expense_id "
+    "WHERE s.is_settled = :unsettled AND s.user_id != e.created_by_id "
+    "GROUP BY s.user_id, e.created_by_id"
+).bindparams(unsettled=False)
+FILL_USER_BALANCES = sa.text(
+    "INSERT INTO user_balances (user_id, owes, owed, updated_at) "
+    "SELECT user_id, SUM(owes), SUM(owed), CURRENT_TIMESTAMP FROM ("
+    "SELECT debtor_id AS user_id, amount AS owes, 0.0 AS owed FROM pair_balances "
+    "UNION ALL SELECT creditor_id, 0.0, amount FROM pair_balances"
+    ") AS per_user GROUP BY user_id"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("user_balances"):
+        op.create_table(
+            "user_balances",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("owes", sa.Float(), nullable=False),
+            sa.Column("owed", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+    if not inspector.has_table("pair_balances"):
+        op.create_table(
+            "pair_balances",
+            sa.Column("debtor_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("creditor_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_pair_balances_creditor_id", "pair_balances", ["creditor_id"])
+
+    # Tables created by create_all start out empty too, so fill whenever empty.
+    # Ledger tables created by a newer create_all already hold cents; the
+    # integer money revision fills those after converting the splits
+    if "amount" not in {column["name"] for column in sa.inspect(bind).get_columns("pair_balances")}:
+        return
+    if bind.exec_driver_sql("SELECT COUNT(*) FROM user_balances").scalar() == 0:
+        bind.execute(FILL_PAIR_BALANCES)
+        bind.execute(FILL_USER_BALANCES)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pair_balances_creditor_id", table_name="pair_balances")
+    op.drop_table("pair_balances")
+    op.drop_table("user_balances")
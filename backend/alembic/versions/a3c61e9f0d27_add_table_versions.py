@@ -0,0 +1,35 @@
+"""add table versions
+
+Per-table change counters bumped by app.versions on commit; read endpoints
+derive their ETags from them.
+
+Revision ID: a3c61e9f0d27
+Revises: fce5a250327b
+Create Date: 2026-10-17 02:12:08.513402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c61e9f0d27'
+down_revision: Union[str, None] = 'fce5a250327b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("table_versions"):
+        op.create_table(
+            "table_versions",
+            sa.Column("name", sa.String(length=50), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("table_versions")
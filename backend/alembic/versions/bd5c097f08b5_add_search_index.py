@@ -0,0 +1,68 @@
+"""add search index
+
+SQLite FTS5 index over ideas, alerts and marketplace items, kept in sync
+by triggers. No-op on other databases.
+
+Revision ID: bd5c097f08b5
+Revises: 0921fa9b362d
+Create Date: 2026-10-17 00:06:23.794769
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bd5c097f08b5'
+down_revision: Union[str, None] = '0921fa9b362d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Index layout as of this revision, copied from app.search so later changes there
+# cannot change what this migration builds. A document's rowid is id * 4 + kind code.
+KIND_SLOTS = 4
+SEARCH_SOURCES = [
+    # (code, table, title expression, body expression, watched columns)
+    (1, "ideas", "{row}.title", "{row}.description", "title, description"),
+    (2, "alerts", "{row}.title", "{row}.description || ' ' || {row}.location", "title, description, location"),
+    (3, "marketplace_items", "{row}.title", "{row}.description", "title, description"),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    created = not sa.inspect(bind).has_table("search_index")
+    if created:
+        op.execute("CREATE VIRTUAL TABLE search_index USING fts5(title, body, tokenize='porter unicode61')")
+        op.execute("INSERT INTO search_index(search_index, rank) VALUES ('rank', 'bm25(2.0, 1.0)')")
+    for code, table, title, body, columns in SEARCH_SOURCES:
+        insert = (
+            f"INSERT INTO search_index(rowid, title, body) "
+            f"VALUES (new.id * {KIND_SLOTS} + {code}, {title.format(row='new')}, {body.format(row='new')});"
+        )
+        delete = f"DELETE FROM search_index WHERE rowid = old.id * {KIND_SLOTS} + {code};"
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {columns} ON {table} "
+            f"BEGIN {delete} {insert} END"
+        )
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END")
+        if created:
+            op.execute(
+                f"INSERT INTO search_index(rowid, title, body) "
+                f"SELECT id * {KIND_SLOTS} + {code}, {title.format(row=table)}, {body.format(row=table)} FROM {table}"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for _, table, *_ in SEARCH_SOURCES:
+        for action in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+    op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,52 @@
+"""add scheduler leases and overdue flags
+
+Lease table for electing the worker that runs background sweeps, plus the
+overdue_at columns those sweeps set and the indexes they range-scan.
+
+Revision ID: fce5a250327b
+Revises: 57903c5cf821
+Create Date: 2026-10-17 00:26:41.042268
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fce5a250327b'
+down_revision: Union[str, None] = '57903c5cf821'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OVERDUE_COLUMNS = {
+    # table: (index name, indexed columns)
+    "marketplace_items": ("ix_marketplace_items_overdue_at_return_by", ["overdue_at", "return_by"]),
+    "expenses": ("ix_expenses_status_overdue_at_due_date", ["status", "overdue_at", "due_date"]),
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("scheduler_leases"):
+        op.create_table(
+            "scheduler_leases",
+            sa.Column("name", sa.String(length=50), primary_key=True),
+            sa.Column("holder", sa.String(length=100), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+    for table, (index_name, columns) in OVERDUE_COLUMNS.items():
+        if "overdue_at" not in {column["name"] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column("overdue_at", sa.DateTime()))
+        if index_name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(index_name, table, columns)
+
+
+def downgrade() -> None:
+    for table, (index_name, _) in OVERDUE_COLUMNS.items():
+        op.drop_index(index_name, table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("overdue_at")
+    op.drop_table("scheduler_leases")
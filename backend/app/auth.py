@@ -1,11 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
+import asyncio
+import os
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
+from .cache import TTLCache
 from .database import get_db
 from .models import User
 from .schemas import TokenData
@@ -15,9 +23,21 @@ SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Token-to-user cache configuration
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+
+# Password hashing pool configuration
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Resolved users keyed by (token subject, token expiry). Entries never outlive
+# the token and are dropped whenever the user row is updated in this process.
+user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -26,21 +46,60 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
-def get_user_by_username(db: Session, username: str) -> Optional[User]:
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event
+# loop. Jobs beyond PASSWORD_HASH_MAX_PENDING are rejected instead of queued.
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_password_jobs = 0
+
+async def _run_password_job(func, *args):
+    """Run a hashing job in the worker pool, failing fast when saturated."""
+    global _pending_password_jobs
+    if _pending_password_jobs >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending_password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, partial(func, *args))
+    finally:
+        _pending_password_jobs -= 1
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the worker pool."""
+    return await _run_password_job(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the worker pool, returning a new hash if the old one is outdated."""
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Get user by username."""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).filter(User.username == username))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email."""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user."""
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Transparently upgrade hashes created with outdated settings
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -54,8 +113,40 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current authenticated user."""
+def _user_snapshot(user: User) -> dict:
+    """Capture a user's column values for caching."""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+async def _user_from_snapshot(db: AsyncSession, snapshot: dict) -> User:
+    """Attach a cached user snapshot to the session without querying."""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+def invalidate_cached_user(username: str) -> int:
+    """Drop cached token resolutions for a user."""
+    return user_cache.invalidate(lambda key: key[0] == username)
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    """Profile changes and deactivation must not be served from the cache."""
+    state = inspect(target)
+    if any(state.attrs[attr.key].history.has_changes() for attr in mapper.column_attrs):
+        # Evicting now would let a concurrent request re-cache the old row
+        # before this transaction commits; evict once it has
+        object_session(target).info.setdefault("updated_usernames", set()).add(target.username)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for username in session.info.pop("updated_usernames", ()):
+        invalidate_cached_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("updated_usernames", None)
+
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
+    """Resolve the user a bearer token belongs to, raising 401 if it is invalid."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -70,11 +161,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=token_data.username)
+    expires_at = payload.get("exp")
+    cache_key = (token_data.username, expires_at)
+    snapshot = user_cache.get(cache_key)
+    if snapshot is not None:
+        return await _user_from_snapshot(db, snapshot)
+    
+    user = await get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    if expires_at is not None:
+        user_cache.set(cache_key, _user_snapshot(user), ttl=expires_at - time.time())
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Get the current authenticated user."""
+    return await get_user_from_token(token, db)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Get the current active user."""
     if not current_user.is_active:
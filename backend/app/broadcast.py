@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Set
+
+from .models import Alert
+from .schemas import Alert as AlertSchema
+
+# Messages a subscriber may lag behind before it is disconnected
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", "100"))
+
+class Broadcaster:
+    """In-process pub/sub fan-out for server-sent events.
+
+    Each message is encoded once and the same bytes are queued for every
+    subscriber, so publishing costs one put_nowait per connection. Idle
+    subscribers cost only an empty queue; a subscriber whose queue fills up
+    is disconnected rather than slowing down everyone else.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.published = 0
+        self.dropped = 0
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """Register a subscriber queue for the duration of the context."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict) -> int:
+        """Queue an event for all subscribers and return how many received it."""
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        delivered = 0
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                # Drop the slow subscriber; None tells its stream to close
+                self._subscribers.discard(queue)
+                self.dropped += 1
+                queue.get_nowait()
+                queue.put_nowait(None)
+        self.published += 1
+        return delivered
+
+    async def stream(self, keepalive: float = 15.0):
+        """Subscribe and yield SSE frames until the client goes away or is dropped."""
+        async with self.subscribe() as queue:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stats(self) -> dict:
+        """Return fan-out counters for monitoring."""
+        return {
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+alert_broadcaster = Broadcaster()
+
+def publish_alert(event: str, alert: Alert) -> None:
+    """Push an alert change to stream subscribers."""
+    alert_broadcaster.publish(event, AlertSchema.model_validate(alert).model_dump(mode="json"))
@@ -1,27 +1,374 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+from typing import List, Optional
+from jose import JWTError, jwt
+import asyncio
+import itertools
+import logging
 import os
 
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
 # Database URL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./community_app.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+def _to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver equivalent."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+# Async URL used by request handlers (can be overridden independently)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+# Production SQLite profile: WAL so readers never wait for the writer, relaxed
+# fsyncs (safe in WAL mode), a larger page cache, memory-mapped reads and a busy
+# timeout instead of immediate "database is locked" errors. Set SQLITE_TUNED=false
+# for SQLite's stock settings
+SQLITE_TUNED = os.getenv("SQLITE_TUNED", "true").lower() in ("1", "true", "yes")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+# Connection pool sizing for server databases
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite runs one writer at a time: writes share a small pool and queue on the
+# database lock for up to the busy timeout (a size of 1 queues them in the pool
+# instead), while GET requests read through their own read-only pool
+SQLITE_WRITE_POOL_SIZE = int(os.getenv("SQLITE_WRITE_POOL_SIZE", "4"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+# Read replicas, comma-separated in the same form as DATABASE_URL. read_* endpoints
+# are served from a healthy replica; everything else goes to the primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+REPLICA_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_CHECK_TIMEOUT_SECONDS", "2"))
+# PostgreSQL replicas further behind than this are skipped
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+# After a user writes, their reads stay on the primary this long so they see their own
+# changes; never shorter than the lag a replica may have while still serving reads
+REPLICA_STICKY_SECONDS = max(float(os.getenv("REPLICA_STICKY_SECONDS", "0")), REPLICA_MAX_LAG_SECONDS)
+
+IS_SQLITE = ASYNC_DATABASE_URL.startswith("sqlite")
+
+_connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+
+def _is_file_database(url: str) -> bool:
+    return make_url(url).database not in (None, "", ":memory:")
+
+def _pool_options(url: str, size: int) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        # Memory databases keep the dialect's single shared connection
+        if not SQLITE_TUNED or not _is_file_database(url):
+            return {}
+        return {"poolclass": AsyncAdaptedQueuePool, "pool_size": size, "max_overflow": 0, "pool_timeout": DB_POOL_TIMEOUT}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _tune_sqlite(sync_engine, read_only: bool = False) -> None:
+    """Apply the SQLite pragmas to every new connection of sync_engine."""
+    pragmas = [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+# Create engine (sync, used for schema creation and scripts)
+engine = create_engine(DATABASE_URL, connect_args=_connect_args)
+
+# Create async engine (used by the API); on SQLite this is the write pool
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=_connect_args, **_pool_options(ASYNC_DATABASE_URL, SQLITE_WRITE_POOL_SIZE)
 )
 
+# Read-only engine for GET requests. Server databases handle concurrent readers
+# in the main pool; tuned SQLite files get a separate pool of reader connections
+if IS_SQLITE and SQLITE_TUNED and _is_file_database(ASYNC_DATABASE_URL):
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL, connect_args=_connect_args, **_pool_options(ASYNC_DATABASE_URL, SQLITE_READ_POOL_SIZE)
+    )
+else:
+    async_read_engine = async_engine
+
+if IS_SQLITE and SQLITE_TUNED:
+    _tune_sqlite(engine)
+    _tune_sqlite(async_engine.sync_engine)
+    if async_read_engine is not async_engine:
+        _tune_sqlite(async_read_engine.sync_engine, read_only=True)
+
+def sync_engines() -> list:
+    """Every distinct engine, for attaching event listeners."""
+    engines = [engine, async_engine.sync_engine]
+    if async_read_engine is not async_engine:
+        engines.append(async_read_engine.sync_engine)
+    if replicas is not None:
+        engines.extend(replica.engine.sync_engine for replica in replicas.replicas)
+    return engines
+
+def pool_stats() -> dict:
+    """Connections in use and idle per async pool, for the metrics endpoint."""
+    stats = {}
+    pools = [("write", async_engine), ("read", async_read_engine)]
+    if replicas is not None:
+        pools.extend((replica.name, replica.engine) for replica in replicas.replicas)
+    for name, _engine in pools:
+        pool = _engine.pool
+        if hasattr(pool, "checkedout"):
+            stats[name] = {"checked_out": pool.checkedout(), "idle": pool.checkedin(), "size": pool.size()}
+    return stats
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create AsyncSessionLocal class; objects stay usable after commit so
+# handlers can serialize them without triggering implicit IO
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Sessions for work that only reads
+AsyncReadSessionLocal = sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+# Replica health is checked with a query against a real table, so an empty or
+# unmigrated database does not pass
+REPLICA_CHECK = text("SELECT 1 FROM users LIMIT 1")
+
+# Seconds a PostgreSQL standby is behind; 0 when it has replayed everything it received
+POSTGRES_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+class Replica:
+    """One read replica: its engine, sessions and last known health."""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        async_url = _to_async_url(url)
+        connect_args = {"check_same_thread": False} if "sqlite" in url else {}
+        self.engine = create_async_engine(
+            async_url, connect_args=connect_args, **_pool_options(async_url, SQLITE_READ_POOL_SIZE)
+        )
+        if async_url.startswith("sqlite") and SQLITE_TUNED:
+            _tune_sqlite(self.engine.sync_engine, read_only=True)
+        self.sessions = sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+        # Unhealthy until the first check passes
+        self.healthy = False
+        self.lag_seconds = 0.0
+        self.reads = 0
+        self.failures = 0
+        event.listen(self.engine.sync_engine, "handle_error", self._handle_error)
+
+    def _handle_error(self, exception_context) -> None:
+        # A replica that drops connections mid-request is taken out until the next check passes
+        if exception_context.is_disconnect or isinstance(exception_context.sqlalchemy_exception, exc.OperationalError):
+            self.mark_down(exception_context.original_exception)
+
+    def mark_down(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning("Read replica %s is unavailable: %s", self.name, error)
+            self.failures += 1
+        self.healthy = False
+
+    async def _probe(self) -> float:
+        async with self.engine.connect() as conn:
+            await conn.execute(REPLICA_CHECK)
+            if conn.dialect.name == "postgresql":
+                return float((await conn.execute(POSTGRES_LAG)).scalar() or 0)
+        return 0.0
+
+    async def check(self) -> None:
+        """Query the replica and update its health and lag."""
+        try:
+            self.lag_seconds = await asyncio.wait_for(self._probe(), REPLICA_CHECK_TIMEOUT_SECONDS)
+        except Exception as error:
+            self.mark_down(error)
+            return
+        healthy = self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Read replica %s is available", self.name)
+            else:
+                logger.warning("Read replica %s is %.1fs behind; reading from the primary", self.name, self.lag_seconds)
+        self.healthy = healthy
+
+class ReplicaRouter:
+    """Route read-only requests across healthy replicas, falling back to the primary.
+
+    Replicas are checked every REPLICA_CHECK_INTERVAL_SECONDS and round-robined
+    while healthy. Users who wrote in the last REPLICA_STICKY_SECONDS read from
+    the primary, so they never miss their own changes on a lagging replica.
+    Stickiness is tracked per process.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+        self._recent_writers = TTLCache(maxsize=100000, ttl=REPLICA_STICKY_SECONDS)
+        self._task: Optional[asyncio.Task] = None
+        self.primary_reads = 0
+
+    def pick(self) -> Optional[Replica]:
+        """Return the next healthy replica, or None when there is none."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def note_write(self, client: Optional[str]) -> None:
+        if client is not None and REPLICA_STICKY_SECONDS > 0:
+            self._recent_writers.set(client, True)
+
+    def wrote_recently(self, client: Optional[str]) -> bool:
+        return client is not None and self._recent_writers.get(client, False)
+
+    def read_sessions(self, client: Optional[str]) -> Optional[sessionmaker]:
+        """Session factory of the replica to serve a read, or None for the primary."""
+        replica = None if self.wrote_recently(client) else self.pick()
+        if replica is None:
+            self.primary_reads += 1
+            return None
+        replica.reads += 1
+        return replica.sessions
+
+    async def check(self) -> None:
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        """Start the periodic health checks."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the health checks and close the replica pools."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        """Return per-replica health and read counters for monitoring."""
+        stats = {
+            replica.name: {
+                "healthy": int(replica.healthy),
+                "lag_seconds": replica.lag_seconds,
+                "reads": replica.reads,
+                "failures": replica.failures,
+            }
+            for replica in self.replicas
+        }
+        stats["primary"] = {"reads": self.primary_reads}
+        return stats
+
+replicas = ReplicaRouter(DATABASE_REPLICA_URLS) if DATABASE_REPLICA_URLS else None
+
+# Request methods whose handlers never write
+READ_METHODS = ("GET", "HEAD")
+
+def _client_key(request: Request) -> Optional[str]:
+    # Key by the token's user, so a fresh token from login still reads what the user
+    # wrote; fall back to the client address. The signature is not checked here: a
+    # forged token can only send its reads to the primary
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            username = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            username = None
+        if username:
+            return f"user:{username}"
+    return request.client.host if request.client else None
+
+def note_user_write(username: str) -> None:
+    """Keep a user's reads on the primary for the sticky window, e.g. after registering."""
+    if replicas is not None:
+        replicas.note_write(f"user:{username}")
+
+def read_session_factory(request: Request) -> sessionmaker:
+    """Sessions for a read-only request: a replica for read_* endpoints when one is usable.
+
+    The choice is kept on the request, so every session it opens sees the same database.
+    """
+    sessions = getattr(request.state, "read_sessions", None)
+    if sessions is None:
+        endpoint = request.scope.get("endpoint")
+        if replicas is not None and getattr(endpoint, "__name__", "").startswith("read_"):
+            sessions = replicas.read_sessions(_client_key(request))
+        request.state.read_sessions = sessions or AsyncReadSessionLocal
+    return request.state.read_sessions
+
+# Dependency to get database session; GET requests read from a replica or the
+# read pool, everything else uses the primary
+async def get_db(request: Request):
+    if request.method in READ_METHODS:
+        async with read_session_factory(request)() as db:
+            yield db
+        return
+    if replicas is not None:
+        replicas.note_write(_client_key(request))
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+    # Restart the sticky window once the write has committed
+    if replicas is not None:
+        replicas.note_write(_client_key(request))
@@ -0,0 +1,88 @@
+import math
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Alerts are bucketed into a fixed lat/lon grid (~1.1 km cells at the equator).
+# A radius query becomes a handful of contiguous cell ranges, one per grid row,
+# each answered by a range scan on the geo_cell index.
+CELL_DEG = 0.01
+LON_CELLS = int(round(360 / CELL_DEG))
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+# Above this many grid rows the OR of ranges costs more than it saves
+MAX_CELL_ROWS = 64
+
+def cell_for(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    """Return the grid cell id for a coordinate, or None if it is missing."""
+    if latitude is None or longitude is None:
+        return None
+    return _lat_index(latitude) * LON_CELLS + _lon_index(longitude)
+
+def _lat_index(latitude: float) -> int:
+    return int(math.floor((min(max(latitude, -90.0), 90.0) + 90.0) / CELL_DEG))
+
+def _lon_index(longitude: float) -> int:
+    return min(int(math.floor((min(max(longitude, -180.0), 180.0) + 180.0) / CELL_DEG)), LON_CELLS - 1)
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_boxes(latitude: float, longitude: float, radius_m: float) -> List[Tuple[float, float, float, float]]:
+    """Return (min_lat, max_lat, min_lon, max_lon) boxes enclosing the circle.
+    
+    A circle that crosses the antimeridian is covered by two boxes, one on
+    each side of it.
+    """
+    dlat = radius_m / METERS_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    min_lat, max_lat = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if dlon >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, -180.0, max_lon), (min_lat, max_lat, min_lon + 360.0, 180.0)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+def cell_ranges(box: Tuple[float, float, float, float]) -> Optional[List[Tuple[int, int]]]:
+    """Return inclusive cell id ranges covering a bounding box, or None if too many rows."""
+    min_lat, max_lat, min_lon, max_lon = box
+    first_row, last_row = _lat_index(min_lat), _lat_index(max_lat)
+    if last_row - first_row + 1 > MAX_CELL_ROWS:
+        return None
+    first_col, last_col = _lon_index(min_lon), _lon_index(max_lon)
+    return [
+        (row * LON_CELLS + first_col, row * LON_CELLS + last_col)
+        for row in range(first_row, last_row + 1)
+    ]
+
+def near_clause(cell_column, lat_column, lon_column, latitude: float, longitude: float, radius_m: float):
+    """Index-friendly prefilter for rows possibly within radius_m of a point."""
+    clauses = []
+    for box in bounding_boxes(latitude, longitude, radius_m):
+        min_lat, max_lat, min_lon, max_lon = box
+        in_box = and_(lat_column.between(min_lat, max_lat), lon_column.between(min_lon, max_lon))
+        ranges = cell_ranges(box)
+        if ranges is None:
+            clauses.append(in_box)
+        else:
+            clauses.append(and_(or_(*[cell_column.between(low, high) for low, high in ranges]), in_box))
+    return or_(*clauses)
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Parse a 'lat,lon' query value."""
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="near must be 'latitude,longitude'")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise HTTPException(status_code=400, detail="near is out of range")
+    return latitude, longitude
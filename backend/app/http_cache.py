@@ -0,0 +1,43 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response
+
+from .versions import table_versions
+
+# Weak ETags for JSON responses. "private, no-cache" lets browsers keep a copy
+# but makes them revalidate it with If-None-Match on every use, so unchanged
+# data costs a 304 with no body.
+CACHE_CONTROL = "private, no-cache"
+
+def weak_etag(data: bytes) -> str:
+    return 'W/"%s"' % hashlib.sha1(data).hexdigest()[:20]
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of etag against the request's If-None-Match header."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag[2:] if tag.startswith("W/") else tag) == opaque
+        for tag in (part.strip() for part in header.split(","))
+    )
+
+async def conditional(request: Request, response: Response, db, tables: Iterable[str], *parts: Any) -> Optional[Response]:
+    """Tag a read from the versions of the tables it serves; 304 if the client is current.
+
+    Call before loading anything, so an unchanged resource costs one primary key
+    lookup instead of the query and serialization. The tag also covers the URL
+    and any extra parts, such as the current user or a row's updated_at. The
+    versions are read first, so the body is never older than its tag.
+    """
+    versions = await table_versions(db, tables)
+    etag = weak_etag(repr((request.url.path, request.url.query, sorted(versions.items()), parts)).encode())
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return None
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import Expense, ExpenseSplit, PairBalance, UserBalance
+
+# Balances are kept per (debtor, creditor) pair and per user. Every change to
+# what a split still owes is applied as a delta in the same transaction, so
+# reading a balance is a primary key lookup instead of an aggregate over splits.
+# The creditor of a split is always the user who created the expense. All
+# amounts are integer minor units, so balances never drift.
+
+LedgerDeltas = Dict[Tuple[int, int], int]
+
+def outstanding(split: ExpenseSplit) -> int:
+    """Cents a split still owes, or 0 once it is settled."""
+    if split.is_settled:
+        return 0
+    return split.amount_owed_cents - (split.amount_paid_cents or 0)
+
+def new_deltas() -> LedgerDeltas:
+    return defaultdict(int)
+
+def add_delta(deltas: LedgerDeltas, debtor_id: int, creditor_id: int, cents: int) -> None:
+    """Record that debtor_id now owes creditor_id `cents` more (or less, if negative)."""
+    if debtor_id != creditor_id and cents:
+        deltas[(debtor_id, creditor_id)] += cents
+
+def _upsert(db, model, keys: Iterable[str], columns: Iterable[str], rows: list):
+    """Insert rows, or add their column values onto the existing row."""
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = model.__table__
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={
+            **{column: table.c[column] + statement.excluded[column] for column in columns},
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    return db.execute(statement, rows)
+
+async def apply_deltas(db, deltas: LedgerDeltas) -> None:
+    """Add pair deltas onto the ledger; the caller commits."""
+    totals: Dict[int, Dict[str, int]] = defaultdict(lambda: {"owes_cents": 0, "owed_cents": 0})
+    pair_rows = []
+    for (debtor_id, creditor_id), cents in deltas.items():
+        if not cents:
+            continue
+        pair_rows.append({"debtor_id": debtor_id, "creditor_id": creditor_id, "amount_cents": cents})
+        totals[debtor_id]["owes_cents"] += cents
+        totals[creditor_id]["owed_cents"] += cents
+    if not pair_rows:
+        return
+    await _upsert(db, PairBalance, ["debtor_id", "creditor_id"], ["amount_cents"], pair_rows)
+    await _upsert(
+        db, UserBalance, ["user_id"], ["owes_cents", "owed_cents"],
+        [{"user_id": user_id, **amounts} for user_id, amounts in totals.items()],
+    )
+
+def rebuild_statements():
+    """INSERT ... SELECT statements that fill an empty ledger from the splits table."""
+    pair_table = PairBalance.__table__
+    user_table = UserBalance.__table__
+    pairs = select(
+        ExpenseSplit.user_id,
+        Expense.created_by_id,
+        func.sum(ExpenseSplit.amount_owed_cents - func.coalesce(ExpenseSplit.amount_paid_cents, 0)),
+        func.current_timestamp(),
+    ).join(Expense, Expense.id == ExpenseSplit.expense_id).filter(
+        ExpenseSplit.is_settled == False,
+        ExpenseSplit.user_id != Expense.created_by_id,
+    ).group_by(ExpenseSplit.user_id, Expense.created_by_id)
+    per_user = union_all(
+        select(pair_table.c.debtor_id.label("user_id"), pair_table.c.amount_cents.label("owes"), literal(0).label("owed")),
+        select(pair_table.c.creditor_id, literal(0), pair_table.c.amount_cents),
+    ).subquery()
+    users = select(
+        per_user.c.user_id,
+        func.sum(per_user.c.owes),
+        func.sum(per_user.c.owed),
+        func.current_timestamp(),
+    ).group_by(per_user.c.user_id)
+    return [
+        pair_table.insert().from_select(["debtor_id", "creditor_id", "amount_cents", "updated_at"], pairs),
+        user_table.insert().from_select(["user_id", "owes_cents", "owed_cents", "updated_at"], users),
+    ]
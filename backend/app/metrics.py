@@ -0,0 +1,224 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .database import sync_engines
+
+# Request and database metrics, exported in the Prometheus text format on
+# /metrics. Everything is plain counters updated on the event loop thread, so
+# recording a request costs a few dictionary updates and a bisect per series.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = ['%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{%s}" % ",".join(parts) if parts else ""
+
+def _format_value(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+class Counter:
+    """Monotonic counter, one series per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in self.values.items()]
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+class Histogram:
+    """Bucketed observations in the Prometheus layout, one series per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status")
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+request_duration = Histogram("http_request_duration_seconds", "Time to serve a request", LATENCY_BUCKETS)
+response_size = Histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS)
+request_statements = Histogram("http_request_db_statements", "SQL statements run per request", STATEMENT_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL per request", LATENCY_BUCKETS)
+db_statements = Counter("db_statements_total", "SQL statements run")
+db_time = Counter("db_seconds_total", "Time spent in SQL")
+
+METRICS = [
+    requests_total, requests_in_flight, request_duration, response_size,
+    request_statements, request_db_time, db_statements, db_time,
+]
+
+# Extra series read from other components when /metrics is scraped
+_collectors: List[Tuple[str, Callable[[], dict], Tuple[str, ...]]] = []
+
+def register_collector(prefix: str, stats: Callable[[], dict], counters: Tuple[str, ...] = ()) -> None:
+    """Export the numeric values of a stats() dict as gauges named prefix_key.
+
+    Keys listed in counters only ever grow and are exported as counters named
+    prefix_key_total. A nested dict becomes one series per key, labelled
+    name="key", as for the scheduler's per-job stats.
+    """
+    _collectors.append((prefix, stats, counters))
+
+def _collected_samples() -> List[str]:
+    series: Dict[str, List[str]] = {}
+    kinds: Dict[str, str] = {}
+    
+    def add(prefix: str, key: str, counters: Tuple[str, ...], labels: Labels, value: float) -> None:
+        name = f"{prefix}_{key}_total" if key in counters else f"{prefix}_{key}"
+        kinds[name] = "counter" if key in counters else "gauge"
+        series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    
+    for prefix, stats, counters in _collectors:
+        for key, value in stats().items():
+            if isinstance(value, dict):
+                for field, field_value in value.items():
+                    if isinstance(field_value, (int, float)):
+                        add(prefix, field, counters, (("name", key),), field_value)
+            elif isinstance(value, (int, float)):
+                add(prefix, key, counters, (), value)
+    lines = []
+    for name, samples in series.items():
+        lines.append(f"# TYPE {name} {kinds[name]}")
+        lines.extend(samples)
+    return lines
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_collected_samples())
+    return "\n".join(lines) + "\n"
+
+class RequestStats:
+    """SQL work done on behalf of the current request."""
+
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+# Set by the middleware; tasks spawned by a request share its stats object
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_statements.inc()
+    db_time.inc(amount=elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+if METRICS_ENABLED:
+    for _engine in sync_engines():
+        event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(_engine, "handle_error", _handle_error)
+
+class MetricsMiddleware:
+    """ASGI middleware that records latency, size and SQL work per route.
+
+    Routes are labelled with their path template (/api/ideas/{idea_id}), so the
+    number of series stays bounded however many ids are requested.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        size = 0
+        
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+        
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _request_stats.reset(token)
+            # FastAPI puts the matched route in the scope while routing
+            route = scope.get("route")
+            labels = (("method", scope["method"]), ("route", route.path_format if route is not None else "unmatched"))
+            requests_total.inc(labels + (("status", str(status)),))
+            request_duration.observe(labels, elapsed)
+            response_size.observe(labels, size)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.db_seconds)
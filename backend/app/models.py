@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Table, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
+from .money import from_cents, to_cents
+
 Base = declarative_base()
 
 # Association table for expense participants
@@ -10,11 +12,16 @@ expense_participants = Table(
     'expense_participants',
     Base.metadata,
     Column('expense_id', Integer, ForeignKey('expenses.id')),
-    Column('user_id', Integer, ForeignKey('users.id'))
+    Column('user_id', Integer, ForeignKey('users.id')),
+    Index('ix_expense_participants_expense_id_user_id', 'expense_id', 'user_id'),
+    Index('ix_expense_participants_user_id_expense_id', 'user_id', 'expense_id')
 )
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
@@ -35,6 +42,12 @@ class User(Base):
 
 class Idea(Base):
     __tablename__ = "ideas"
+    __table_args__ = (
+        Index("ix_ideas_created_at_id", "created_at", "id"),
+        Index("ix_ideas_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_ideas_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_ideas_author_id", "author_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -50,8 +63,30 @@ class Idea(Base):
     # Relationships
     author = relationship("User", back_populates="ideas")
 
+class IdeaVote(Base):
+    __tablename__ = "idea_votes"
+    __table_args__ = (
+        UniqueConstraint("idea_id", "user_id", name="uq_idea_votes_idea_id_user_id"),
+        Index("ix_idea_votes_user_id", "user_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    idea_id = Column(Integer, ForeignKey("ideas.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    vote_type = Column(String(10), nullable=False)  # up, down
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_created_at_id", "created_at", "id"),
+        Index("ix_alerts_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_alerts_severity_created_at_id", "severity", "created_at", "id"),
+        Index("ix_alerts_alert_type_created_at_id", "alert_type", "created_at", "id"),
+        Index("ix_alerts_author_id", "author_id"),
+        Index("ix_alerts_geo_cell", "geo_cell"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -60,8 +95,9 @@ class Alert(Base):
     location = Column(String(200), nullable=False)
     latitude = Column(Float)
     longitude = Column(Float)
+    geo_cell = Column(Integer)  # grid cell of latitude/longitude, see app/geo.py
     severity = Column(String(20), default="medium")  # low, medium, high, critical
-    status = Column(String(20), default="active")  # active, resolved, false_alarm
+    status = Column(String(20), default="active")  # active, resolved, false_alarm, expired
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime)
@@ -71,6 +107,14 @@ class Alert(Base):
 
 class MarketplaceItem(Base):
     __tablename__ = "marketplace_items"
+    __table_args__ = (
+        Index("ix_marketplace_items_created_at_id", "created_at", "id"),
+        Index("ix_marketplace_items_availability_created_at_id", "availability", "created_at", "id"),
+        Index("ix_marketplace_items_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_marketplace_items_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_marketplace_items_current_borrower_id_availability", "current_borrower_id", "availability"),
+        Index("ix_marketplace_items_overdue_at_return_by", "overdue_at", "return_by"),
+    )
     id = Column(Integer, primary_key=True)
     seller_id = Column(Integer, ForeignKey("users.id"))
     buyer_id = Column(Integer, ForeignKey("users.id"))
@@ -86,42 +130,124 @@ class MarketplaceItem(Base):
     current_borrower_id = Column(Integer, ForeignKey("users.id"))
     borrowed_at = Column(DateTime)
     return_by = Column(DateTime)
+    overdue_at = Column(DateTime)  # set by the overdue sweep, cleared on return
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    owner = relationship("User", foreign_keys=[owner_id])
     seller = relationship("User", foreign_keys=[seller_id], back_populates="marketplace_items")
     buyer = relationship("User", foreign_keys=[buyer_id])
 
+class Reservation(Base):
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Overlap probes for one item scan starts_at and read ends_at from the index
+        Index("ix_reservations_item_id_starts_at_ends_at", "item_id", "starts_at", "ends_at"),
+        Index("ix_reservations_user_id_starts_at", "user_id", "starts_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("marketplace_items.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)  # exclusive
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        Index("ix_expenses_created_at_id", "created_at", "id"),
+        Index("ix_expenses_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_expenses_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_expenses_created_by_id_created_at_id", "created_by_id", "created_at", "id"),
+        Index("ix_expenses_status_overdue_at_due_date", "status", "overdue_at", "due_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text)
-    total_amount = Column(Float, nullable=False)
+    total_amount_cents = Column(Integer, nullable=False)
     category = Column(String(50), nullable=False)  # maintenance, events, utilities, etc.
     split_type = Column(String(20), default="equal")  # equal, custom, by_percentage
     status = Column(String(20), default="pending")  # pending, settled, cancelled
     created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     due_date = Column(DateTime)
+    overdue_at = Column(DateTime)  # set by the overdue sweep once due_date passes unpaid
     settled_at = Column(DateTime)
     
     # Relationships
     created_by = relationship("User", back_populates="created_expenses")
     participants = relationship("User", secondary=expense_participants, back_populates="participated_expenses")
     splits = relationship("ExpenseSplit", back_populates="expense")
+    
+    # Major-unit views of the stored minor units, used by the API schemas
+    @property
+    def total_amount(self) -> float:
+        return from_cents(self.total_amount_cents)
+    
+    @total_amount.setter
+    def total_amount(self, value: float) -> None:
+        self.total_amount_cents = to_cents(value)
 
 class ExpenseSplit(Base):
     __tablename__ = "expense_splits"
+    __table_args__ = (
+        Index("ix_expense_splits_expense_id_user_id", "expense_id", "user_id"),
+        Index("ix_expense_splits_user_id_is_settled", "user_id", "is_settled"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    amount_owed = Column(Float, nullable=False)
-    amount_paid = Column(Float, default=0.0)
+    amount_owed_cents = Column(Integer, nullable=False)
+    amount_paid_cents = Column(Integer, nullable=False, default=0)
     is_settled = Column(Boolean, default=False)
     settled_at = Column(DateTime)
     
     # Relationships
     expense = relationship("Expense", back_populates="splits")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    @property
+    def amount_owed(self) -> float:
+        return from_cents(self.amount_owed_cents)
+    
+    @property
+    def amount_paid(self) -> float:
+        return from_cents(self.amount_paid_cents)
+
+
+# Expense ledger: running totals of unsettled splits, kept in step by app.ledger
+class UserBalance(Base):
+    __tablename__ = "user_balances"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    owes_cents = Column(Integer, nullable=False, default=0)  # still to pay to others
+    owed_cents = Column(Integer, nullable=False, default=0)  # still to receive from others
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PairBalance(Base):
+    __tablename__ = "pair_balances"
+    __table_args__ = (
+        Index("ix_pair_balances_creditor_id", "creditor_id"),
+    )
+    
+    debtor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    creditor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    amount_cents = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+# Change counter per table, bumped by app.versions whenever a transaction that
+# wrote to the table commits
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
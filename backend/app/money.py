@@ -0,0 +1,33 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Optional, Sequence
+
+# Money is stored as integer minor units (paise/cents). The API still speaks in
+# major units, so amounts are converted only at the request/response boundary.
+
+MINOR_UNITS = 100
+
+def to_cents(amount: float) -> int:
+    """Convert a major-unit amount to minor units, rounding half up."""
+    # Going through str() avoids binary float artefacts such as 0.1 + 0.2
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents: Optional[int]) -> float:
+    """Convert minor units back to a major-unit amount for the API."""
+    return (cents or 0) / MINOR_UNITS
+
+def allocate(total_cents: int, weights: Sequence[int]) -> List[int]:
+    """Split total_cents in proportion to weights so the shares sum exactly.
+
+    Each share first gets its floor; the leftover cents go one each to the
+    largest fractional remainders, ties broken by position. The result only
+    depends on the inputs, so the same expense always splits the same way.
+    """
+    weight_total = sum(weights)
+    if weight_total <= 0:
+        raise ValueError("weights must add up to a positive number")
+    shares = [total_cents * weight // weight_total for weight in weights]
+    remainders = [total_cents * weight % weight_total for weight in weights]
+    leftover = total_cents - sum(shares)
+    for index in sorted(range(len(weights)), key=lambda i: -remainders[i])[:leftover]:
+        shares[index] += 1
+    return shares
@@ -0,0 +1,36 @@
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query, model, skip: int, limit: int, cursor: Optional[str] = None):
+    """Order newest first and apply keyset pagination if a cursor is given, else skip/limit."""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        return query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int) -> None:
+    """Expose the cursor of the following page when this page is full."""
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
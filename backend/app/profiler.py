@@ -0,0 +1,119 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Sampling profiler configuration. A request is profiled when it carries
+# PROFILE_HEADER with the PROFILER_TOKEN value, or at random with
+# PROFILE_SAMPLE_RATE (0 to 1). Without a token the header is ignored.
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile").lower().encode()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+PROFILER_ENABLED = bool(PROFILER_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Sampler:
+    """Samples the stack of one thread while a request is being served.
+
+    The event loop interleaves requests, so a sample only counts when the
+    request's own frame is on the stack; everything the loop did for other
+    requests in the meantime is left out. Stacks are kept in the folded
+    format ("outer;inner;leaf count") that flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, root_frame, interval: float):
+        self.root_frame = root_frame
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if frame is self.root_frame:
+                self.stacks[";".join(reversed(labels))] += 1
+                return
+            frame = frame.f_back
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            self._sample()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+def _should_profile(scope) -> bool:
+    if PROFILER_TOKEN:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value.decode("latin-1") == PROFILER_TOKEN
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class ProfilerMiddleware:
+    """ASGI middleware that profiles selected requests into PROFILE_DIR."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        sampler = Sampler(sys._getframe(), PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            try:
+                path = self._output_path(scope)
+                sampler.write(path)
+                logger.info(
+                    "Profiled %s %s in %.1f ms: %d of %d samples in the request, written to %s",
+                    scope["method"], scope["path"], elapsed_ms,
+                    sum(sampler.stacks.values()), sampler.samples, path
+                )
+            except OSError:
+                logger.exception("Could not write profile for %s %s", scope["method"], scope["path"])
+
+    @staticmethod
+    def _output_path(scope) -> str:
+        route = scope.get("route")
+        name = route.path_format if route is not None else scope["path"]
+        name = _UNSAFE_FILENAME.sub("_", f"{scope['method']}{name}").strip("_")
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return os.path.join(PROFILE_DIR, f"{timestamp}-{name}.folded")
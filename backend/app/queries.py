@@ -0,0 +1,33 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import Idea, Alert, MarketplaceItem, Expense, ExpenseSplit
+
+# Base SELECTs for each response schema. Every relationship the schema
+# serializes is loaded up front so a page costs a fixed number of queries:
+# many-to-one users are joined into the main query, collections are fetched
+# with one extra IN query each.
+
+def idea_query():
+    """Select ideas with their author."""
+    return select(Idea).options(joinedload(Idea.author))
+
+def alert_query():
+    """Select alerts with their author."""
+    return select(Alert).options(joinedload(Alert.author))
+
+def item_query():
+    """Select marketplace items with their owner."""
+    return select(MarketplaceItem).options(joinedload(MarketplaceItem.owner))
+
+def split_query():
+    """Select expense splits with their user."""
+    return select(ExpenseSplit).options(joinedload(ExpenseSplit.user))
+
+def expense_query():
+    """Select expenses with creator, participants and splits (with users)."""
+    return select(Expense).options(
+        joinedload(Expense.created_by),
+        selectinload(Expense.participants),
+        selectinload(Expense.splits).joinedload(ExpenseSplit.user)
+    )
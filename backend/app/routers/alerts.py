@@ -1,19 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from ..database import get_db
+from ..database import get_db, AsyncReadSessionLocal
 from ..models import User, Alert
 from ..schemas import Alert as AlertSchema, AlertCreate, AlertUpdate
-from ..auth import get_current_active_user
+from ..auth import get_current_active_user, get_user_from_token
+from ..broadcast import alert_broadcaster, publish_alert
+from ..queries import alert_query
+from ..pagination import paginate, set_next_cursor
+from ..geo import cell_for, haversine_m, near_clause, parse_point
+from ..http_cache import conditional
 
 router = APIRouter()
 
+# Tables an alert response is built from
+ALERT_TABLES = ("alerts", "users")
+
+async def _read_alerts_near(db: AsyncSession, query, near: str, radius_m: float, skip: int, limit: int, cursor: Optional[str]):
+    """Page through alerts within radius_m of a point, newest first."""
+    latitude, longitude = parse_point(near)
+    # Grid cells and bounding box narrow candidates in SQL; haversine is exact
+    query = query.filter(near_clause(Alert.geo_cell, Alert.latitude, Alert.longitude, latitude, longitude, radius_m))
+    result = await db.stream(paginate(query, Alert, 0, None, cursor).execution_options(yield_per=100))
+    alerts = []
+    matched = 0
+    async for alert in result.scalars():
+        if haversine_m(latitude, longitude, alert.latitude, alert.longitude) > radius_m:
+            continue
+        matched += 1
+        if matched > skip:
+            alerts.append(alert)
+            if len(alerts) == limit:
+                break
+    await result.close()
+    return alerts
+
 @router.post("/", response_model=AlertSchema)
 async def create_alert(
     alert: AlertCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new safety alert."""
     db_alert = Alert(
@@ -23,26 +51,37 @@ async def create_alert(
         location=alert.location,
         latitude=alert.latitude,
         longitude=alert.longitude,
+        geo_cell=cell_for(alert.latitude, alert.longitude),
         severity=alert.severity,
-        author_id=current_user.id
+        author_id=current_user.id,
+        author=current_user
     )
     db.add(db_alert)
-    db.commit()
-    db.refresh(db_alert)
+    await db.commit()
+    publish_alert("alert_created", db_alert)
     return db_alert
 
 @router.get("/", response_model=List[AlertSchema])
 async def read_alerts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
     alert_type: Optional[str] = Query(None, description="Filter by alert type"),
     severity: Optional[str] = Query(None, description="Filter by severity"),
     status: Optional[str] = Query(None, description="Filter by status"),
-    db: Session = Depends(get_db),
+    near: Optional[str] = Query(None, description="Only alerts near 'latitude,longitude'"),
+    radius_m: float = Query(1000, gt=0, le=100000, description="Radius in meters for near"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of alerts with optional filters."""
-    query = db.query(Alert)
+    not_modified = await conditional(request, response, db, ALERT_TABLES)
+    if not_modified is not None:
+        return not_modified
+    
+    query = alert_query()
     
     if alert_type:
         query = query.filter(Alert.alert_type == alert_type)
@@ -51,30 +90,67 @@ async def read_alerts(
     if status:
         query = query.filter(Alert.status == status)
     
-    alerts = query.order_by(Alert.created_at.desc()).offset(skip).limit(limit).all()
+    if near:
+        alerts = await _read_alerts_near(db, query, near, radius_m, skip, limit, cursor)
+    else:
+        result = await db.execute(paginate(query, Alert, skip, limit, cursor))
+        alerts = result.scalars().all()
+    set_next_cursor(response, alerts, limit)
     return alerts
 
 @router.get("/active", response_model=List[AlertSchema])
 async def read_active_alerts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get active alerts only."""
-    alerts = db.query(Alert).filter(
-        Alert.status == "active"
-    ).order_by(Alert.created_at.desc()).offset(skip).limit(limit).all()
+    not_modified = await conditional(request, response, db, ALERT_TABLES)
+    if not_modified is not None:
+        return not_modified
+    
+    query = alert_query().filter(Alert.status == "active")
+    result = await db.execute(paginate(query, Alert, skip, limit, cursor))
+    alerts = result.scalars().all()
+    set_next_cursor(response, alerts, limit)
     return alerts
 
+@router.get("/stream")
+async def stream_alerts(
+    token: str = Query(..., description="Access token (EventSource cannot send headers)")
+):
+    """Stream alert changes as server-sent events."""
+    # Authenticate with a short-lived session so idle streams hold no connection
+    async with AsyncReadSessionLocal() as db:
+        current_user = await get_user_from_token(token, db)
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    
+    return StreamingResponse(
+        alert_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{alert_id}", response_model=AlertSchema)
 async def read_alert(
     alert_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get alert by ID."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    not_modified = await conditional(request, response, db, ALERT_TABLES)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(alert_query().filter(Alert.id == alert_id))
+    alert = result.scalars().first()
     if alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     return alert
@@ -84,10 +160,11 @@ async def update_alert(
     alert_id: int,
     alert_update: AlertUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an alert (only by author)."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    result = await db.execute(alert_query().filter(Alert.id == alert_id))
+    alert = result.scalars().first()
     if alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     
@@ -103,18 +180,19 @@ async def update_alert(
         from datetime import datetime
         alert.resolved_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(alert)
+    await db.commit()
+    publish_alert("alert_updated", alert)
     return alert
 
 @router.post("/{alert_id}/resolve")
 async def resolve_alert(
     alert_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark an alert as resolved."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    result = await db.execute(alert_query().filter(Alert.id == alert_id))
+    alert = result.scalars().first()
     if alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     
@@ -126,17 +204,19 @@ async def resolve_alert(
     from datetime import datetime
     alert.resolved_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
+    publish_alert("alert_resolved", alert)
     return {"message": "Alert resolved successfully"}
 
 @router.delete("/{alert_id}")
 async def delete_alert(
     alert_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an alert (only by author)."""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    result = await db.execute(alert_query().filter(Alert.id == alert_id))
+    alert = result.scalars().first()
     if alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     
@@ -144,6 +224,7 @@ async def delete_alert(
     if alert.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this alert")
     
-    db.delete(alert)
-    db.commit()
+    await db.delete(alert)
+    await db.commit()
+    alert_broadcaster.publish("alert_deleted", {"id": alert_id})
     return {"message": "Alert deleted successfully"}
\ No newline at end of file
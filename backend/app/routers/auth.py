@@ -1,41 +1,43 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_db, note_user_write
 from ..models import User
 from ..schemas import UserCreate, User as UserSchema, Token, LoginRequest
 from ..auth import (
     authenticate_user,
     create_access_token,
-    get_password_hash,
+    hash_password,
     get_user_by_username,
     get_user_by_email,
+    get_current_active_user,
+    user_cache,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     # Check if username already exists
-    if get_user_by_username(db, user.username):
+    if await get_user_by_username(db, user.username):
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
     
     # Check if email already exists
-    if get_user_by_email(db, user.email):
+    if await get_user_by_email(db, user.email):
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -46,21 +48,23 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    note_user_write(db_user.username)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Login user and return access token."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # A just-registered account may not have reached the replicas yet
+    note_user_write(user.username)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -68,17 +72,24 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login-json", response_model=Token)
-async def login_json(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login_json(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Login user with JSON data and return access token."""
-    user = authenticate_user(db, login_data.username, login_data.password)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # A just-registered account may not have reached the replicas yet
+    note_user_write(user.username)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/cache-stats")
+async def read_cache_stats(current_user: User = Depends(get_current_active_user)):
+    """Get hit/miss counters of the token-to-user cache."""
+    return user_cache.stats()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db, read_session_factory
+from ..models import User, Idea, Alert, MarketplaceItem, Expense
+from ..schemas import (
+    Dashboard, DashboardExpense, DashboardItem,
+    Idea as IdeaSchema, Alert as AlertSchema
+)
+from ..auth import get_current_active_user
+from ..queries import idea_query, alert_query
+from ..pagination import paginate
+from ..http_cache import conditional
+
+router = APIRouter()
+
+# Rows shown per dashboard section
+DASHBOARD_LIMIT = int(os.getenv("DASHBOARD_LIMIT", "5"))
+
+# Tables the dashboard sections read
+DASHBOARD_TABLES = ("ideas", "alerts", "marketplace_items", "expenses", "expense_participants", "users")
+
+async def _section(sessions, query, model, schema):
+    """Load one dashboard section in its own session so sections run concurrently."""
+    async with sessions() as db:
+        result = await db.execute(paginate(query, model, 0, DASHBOARD_LIMIT))
+        return [schema.model_validate(row) for row in result.scalars().all()]
+
+@router.get("/", response_model=Dashboard)
+async def read_dashboard(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get recent ideas, active alerts, available items and the user's expenses in one call."""
+    not_modified = await conditional(request, response, db, DASHBOARD_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    # Hand the request's connection back before the sections check out their own,
+    # so concurrent dashboards cannot exhaust a bounded pool waiting on each other
+    await db.commit()
+    
+    my_expenses = select(Expense).filter(
+        (Expense.created_by_id == current_user.id) |
+        (Expense.participants.any(User.id == current_user.id))
+    )
+    sessions = read_session_factory(request)
+    ideas, alerts, items, expenses = await asyncio.gather(
+        _section(sessions, idea_query(), Idea, IdeaSchema),
+        _section(sessions, alert_query().filter(Alert.status == "active"), Alert, AlertSchema),
+        _section(sessions, select(MarketplaceItem).filter(MarketplaceItem.availability == True), MarketplaceItem, DashboardItem),
+        _section(sessions, my_expenses, Expense, DashboardExpense)
+    )
+    return Dashboard(ideas=ideas, active_alerts=alerts, marketplace_items=items, expenses=expenses)
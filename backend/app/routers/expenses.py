@@ -1,88 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, delete, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime
+import math
+import os
 
 from ..database import get_db
-from ..models import User, Expense, ExpenseSplit
-from ..schemas import Expense as ExpenseSchema, ExpenseCreate, ExpenseUpdate, ExpenseSplit as ExpenseSplitSchema
+from ..models import User, Expense, ExpenseSplit, PairBalance, UserBalance, expense_participants
+from ..schemas import (
+    Expense as ExpenseSchema, ExpenseCreate, ExpenseUpdate, ExpenseSplit as ExpenseSplitSchema,
+    BalanceSummary, CounterpartyBalance, SettlementTransfer
+)
 from ..auth import get_current_active_user
+from ..queries import expense_query, split_query
+from ..pagination import paginate, set_next_cursor
+from .. import ledger
+from ..settlement import plan_settlement
+from ..money import allocate, from_cents, to_cents
+from ..http_cache import conditional
 
 router = APIRouter()
 
-@router.post("/", response_model=ExpenseSchema)
-async def create_expense(
-    expense: ExpenseCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Create a new expense."""
+# Upper bound on expenses accepted by one bulk request
+BULK_EXPENSE_LIMIT = int(os.getenv("BULK_EXPENSE_LIMIT", "500"))
+
+# Statuses after which an expense's splits are closed and off the ledger
+CLOSED_STATUSES = ("settled", "cancelled")
+
+# Tables an expense response is built from
+EXPENSE_TABLES = ("expenses", "expense_participants", "expense_splits", "users")
+# Tables a split response is built from
+SPLIT_TABLES = ("expense_splits", "expenses", "users")
+
+def _plan_splits(expense: ExpenseCreate, participant_ids: List[int]) -> List[Tuple[int, int]]:
+    """Validate an expense's split definition and return (user_id, cents owed) pairs."""
+    total_cents = to_cents(expense.total_amount)
+    if expense.split_type == "equal":
+        # Leftover cents go to the first participants, in request order
+        shares = allocate(total_cents, [1] * len(participant_ids))
+        return list(zip(participant_ids, shares))
+    if expense.split_type == "custom" and expense.custom_splits:
+        splits = [(split.user_id, to_cents(split.amount_owed)) for split in expense.custom_splits]
+        if sum(cents for _, cents in splits) != total_cents:
+            raise HTTPException(status_code=400, detail="Custom split amounts don't match total amount")
+        participant_set = set(participant_ids)
+        if any(user_id not in participant_set for user_id, _ in splits):
+            raise HTTPException(status_code=400, detail="Split user must be a participant")
+        return splits
+    return []
+
+async def create_expenses(db: AsyncSession, expenses: List[ExpenseCreate], created_by_id: int) -> List[int]:
+    """Validate and insert expenses with their participants and splits in one transaction.
+
+    Everything is checked before the first write, so a bad entry leaves nothing
+    behind. Participant and split rows go out as one executemany per table.
+    """
+    participant_lists = [list(dict.fromkeys(expense.participant_ids)) for expense in expenses]
+    if any(not participant_ids for participant_ids in participant_lists):
+        raise HTTPException(status_code=400, detail="At least one participant is required")
+    
     # Validate participants exist
-    participants = db.query(User).filter(User.id.in_(expense.participant_ids)).all()
-    if len(participants) != len(expense.participant_ids):
+    wanted = set().union(*participant_lists)
+    result = await db.execute(select(User.id).filter(User.id.in_(wanted)))
+    if len(set(result.scalars().all())) != len(wanted):
         raise HTTPException(status_code=400, detail="One or more participants not found")
     
-    # Create expense
-    db_expense = Expense(
-        title=expense.title,
-        description=expense.description,
-        total_amount=expense.total_amount,
-        category=expense.category,
-        split_type=expense.split_type,
-        due_date=expense.due_date,
-        created_by_id=current_user.id
-    )
+    planned_splits = [
+        _plan_splits(expense, participant_ids)
+        for expense, participant_ids in zip(expenses, participant_lists)
+    ]
     
-    # Add participants
-    for participant in participants:
-        db_expense.participants.append(participant)
+    db_expenses = [
+        Expense(
+            title=expense.title,
+            description=expense.description,
+            total_amount_cents=to_cents(expense.total_amount),
+            category=expense.category,
+            split_type=expense.split_type,
+            due_date=expense.due_date,
+            created_by_id=created_by_id
+        )
+        for expense in expenses
+    ]
+    db.add_all(db_expenses)
+    await db.flush()
     
-    db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+    participant_rows = [
+        {"expense_id": db_expense.id, "user_id": user_id}
+        for db_expense, participant_ids in zip(db_expenses, participant_lists)
+        for user_id in participant_ids
+    ]
+    split_rows = [
+        {"expense_id": db_expense.id, "user_id": user_id, "amount_owed_cents": cents}
+        for db_expense, splits in zip(db_expenses, planned_splits)
+        for user_id, cents in splits
+    ]
+    await db.execute(insert(expense_participants), participant_rows)
+    if split_rows:
+        await db.execute(insert(ExpenseSplit.__table__), split_rows)
     
-    # Create expense splits
-    if expense.split_type == "equal":
-        amount_per_person = expense.total_amount / len(participants)
-        for participant in participants:
-            split = ExpenseSplit(
-                expense_id=db_expense.id,
-                user_id=participant.id,
-                amount_owed=amount_per_person
-            )
-            db.add(split)
-    elif expense.split_type == "custom" and expense.custom_splits:
-        total_custom = sum(split.amount_owed for split in expense.custom_splits)
-        if abs(total_custom - expense.total_amount) > 0.01:  # Allow for small rounding errors
-            raise HTTPException(status_code=400, detail="Custom split amounts don't match total amount")
-        
-        for custom_split in expense.custom_splits:
-            if custom_split.user_id not in expense.participant_ids:
-                raise HTTPException(status_code=400, detail="Split user must be a participant")
-            
-            split = ExpenseSplit(
-                expense_id=db_expense.id,
-                user_id=custom_split.user_id,
-                amount_owed=custom_split.amount_owed
-            )
-            db.add(split)
-    
-    db.commit()
-    db.refresh(db_expense)
-    return db_expense
+    deltas = ledger.new_deltas()
+    for row in split_rows:
+        ledger.add_delta(deltas, row["user_id"], created_by_id, row["amount_owed_cents"])
+    await ledger.apply_deltas(db, deltas)
+    await db.commit()
+    return [db_expense.id for db_expense in db_expenses]
+
+async def _load_expenses(db: AsyncSession, expense_ids: List[int]) -> List[Expense]:
+    result = await db.execute(
+        expense_query().filter(
+            Expense.id.in_(expense_ids)
+        ).execution_options(populate_existing=True)
+    )
+    by_id = {expense.id: expense for expense in result.scalars().all()}
+    return [by_id[expense_id] for expense_id in expense_ids]
+
+@router.post("/", response_model=ExpenseSchema)
+async def create_expense(
+    expense: ExpenseCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a new expense."""
+    expense_ids = await create_expenses(db, [expense], current_user.id)
+    return (await _load_expenses(db, expense_ids))[0]
+
+@router.post("/bulk", response_model=List[ExpenseSchema])
+async def create_expenses_bulk(
+    expenses: List[ExpenseCreate],
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create several expenses at once; either all of them are created or none."""
+    if not expenses:
+        return []
+    if len(expenses) > BULK_EXPENSE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_EXPENSE_LIMIT} expenses per request")
+    expense_ids = await create_expenses(db, expenses, current_user.id)
+    return await _load_expenses(db, expense_ids)
 
 @router.get("/", response_model=List[ExpenseSchema])
 async def read_expenses(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
     my_expenses_only: bool = Query(False, description="Show only expenses I'm involved in"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of expenses with optional filters."""
-    query = db.query(Expense)
+    not_modified = await conditional(request, response, db, EXPENSE_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    query = expense_query()
     
     if my_expenses_only:
         # Filter expenses where user is creator or participant
@@ -96,40 +175,134 @@ async def read_expenses(
     if status:
         query = query.filter(Expense.status == status)
     
-    expenses = query.order_by(Expense.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(paginate(query, Expense, skip, limit, cursor))
+    expenses = result.scalars().all()
+    set_next_cursor(response, expenses, limit)
     return expenses
 
 @router.get("/my-splits", response_model=List[ExpenseSplitSchema])
 async def read_my_splits(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's expense splits."""
-    splits = db.query(ExpenseSplit).filter(
-        ExpenseSplit.user_id == current_user.id
-    ).join(Expense).order_by(Expense.created_at.desc()).all()
+    not_modified = await conditional(request, response, db, SPLIT_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(
+        split_query().filter(
+            ExpenseSplit.user_id == current_user.id
+        ).join(Expense).order_by(Expense.created_at.desc())
+    )
+    splits = result.scalars().all()
     return splits
 
 @router.get("/pending-payments", response_model=List[ExpenseSplitSchema])
 async def read_pending_payments(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's pending payments."""
-    splits = db.query(ExpenseSplit).filter(
-        ExpenseSplit.user_id == current_user.id,
-        ExpenseSplit.is_settled == False
-    ).join(Expense).order_by(Expense.created_at.desc()).all()
+    not_modified = await conditional(request, response, db, SPLIT_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(
+        split_query().filter(
+            ExpenseSplit.user_id == current_user.id,
+            ExpenseSplit.is_settled == False
+        ).join(Expense).order_by(Expense.created_at.desc())
+    )
+    splits = result.scalars().all()
     return splits
 
+@router.get("/balances", response_model=BalanceSummary)
+async def read_balances(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get what the current user owes and is owed, overall and per counterparty."""
+    not_modified = await conditional(request, response, db, ("user_balances", "pair_balances", "users"), current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    totals = await db.get(UserBalance, current_user.id)
+    result = await db.execute(
+        select(PairBalance).filter(
+            or_(PairBalance.debtor_id == current_user.id, PairBalance.creditor_id == current_user.id)
+        )
+    )
+    # Net both directions of each pair; positive means they owe the current user
+    net = defaultdict(int)
+    for pair in result.scalars():
+        if pair.creditor_id == current_user.id:
+            net[pair.debtor_id] += pair.amount_cents
+        else:
+            net[pair.creditor_id] -= pair.amount_cents
+    net = {user_id: cents for user_id, cents in net.items() if cents}
+    
+    result = await db.execute(select(User).filter(User.id.in_(net)))
+    users = {user.id: user for user in result.scalars()}
+    owes = totals.owes_cents if totals else 0
+    owed = totals.owed_cents if totals else 0
+    return BalanceSummary(
+        owes=from_cents(owes),
+        owed=from_cents(owed),
+        net=from_cents(owed - owes),
+        counterparties=[
+            CounterpartyBalance(user=users[user_id], amount=from_cents(cents))
+            for user_id, cents in sorted(net.items(), key=lambda item: -abs(item[1]))
+        ]
+    )
+
+@router.get("/settle-plan", response_model=List[SettlementTransfer])
+async def read_settle_plan(
+    request: Request,
+    response: Response,
+    mine_only: bool = Query(False, description="Only transfers the current user sends or receives"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Suggest the fewest transfers that settle every outstanding balance in the community."""
+    not_modified = await conditional(request, response, db, ("user_balances",), current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    net = UserBalance.owed_cents - UserBalance.owes_cents
+    result = await db.execute(select(UserBalance.user_id, net).filter(net != 0))
+    balances = dict(result.all())
+    transfers = plan_settlement(balances)
+    if mine_only:
+        transfers = [t for t in transfers if current_user.id in (t[0], t[1])]
+    return [
+        SettlementTransfer(from_user_id=from_user_id, to_user_id=to_user_id, amount=from_cents(cents))
+        for from_user_id, to_user_id, cents in transfers
+    ]
+
 @router.get("/{expense_id}", response_model=ExpenseSchema)
 async def read_expense(
     expense_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get expense by ID."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    # The tag includes the user, so only someone who was allowed to read the
+    # expense can hold a matching one; access changes move the versions
+    not_modified = await conditional(request, response, db, EXPENSE_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(expense_query().filter(Expense.id == expense_id))
+    expense = result.scalars().first()
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -147,10 +320,11 @@ async def update_expense(
     expense_id: int,
     expense_update: ExpenseUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an expense (only by creator)."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    result = await db.execute(expense_query().filter(Expense.id == expense_id))
+    expense = result.scalars().first()
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -158,38 +332,82 @@ async def update_expense(
     if expense.created_by_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this expense")
     
-    for field, value in expense_update.dict(exclude_unset=True).items():
+    changes = expense_update.dict(exclude_unset=True)
+    if changes.get("total_amount") is not None and expense.splits and to_cents(changes["total_amount"]) != expense.total_amount_cents:
+        # The splits and the ledger were allocated from the old total
+        raise HTTPException(status_code=400, detail="Cannot change the total of an expense that has splits")
+    
+    was_closed = expense.status in CLOSED_STATUSES
+    for field, value in changes.items():
         setattr(expense, field, value)
     
-    # Set settled timestamp if status changed to settled
-    if expense_update.status == "settled" and expense.status != "settled":
-        expense.settled_at = datetime.utcnow()
-        # Mark all splits as settled
+    # Settling or cancelling closes every open split and takes what it still
+    # owed off the ledger, each split only if no payment changed it since it was read
+    if expense_update.status in CLOSED_STATUSES and not was_closed:
+        now = datetime.utcnow()
+        if expense_update.status == "settled":
+            expense.settled_at = now
+        deltas = ledger.new_deltas()
         for split in expense.splits:
-            split.is_settled = True
-            split.settled_at = datetime.utcnow()
+            if split.is_settled:
+                continue
+            if not await _update_open_split(db, split, split.amount_paid_cents, True, now):
+                await db.rollback()
+                raise HTTPException(status_code=409, detail="A payment was just recorded on this expense; try again")
+            ledger.add_delta(deltas, split.user_id, expense.created_by_id, -ledger.outstanding(split))
+            set_committed_value(split, "is_settled", True)
+            set_committed_value(split, "settled_at", now)
+        await ledger.apply_deltas(db, deltas)
     
-    db.commit()
-    db.refresh(expense)
+    await db.commit()
     return expense
 
+async def _update_open_split(db: AsyncSession, split: ExpenseSplit, paid_cents: int, settled: bool, now: datetime) -> bool:
+    """Write a split's new payment state, provided it is still open and unchanged since it was read.
+
+    Returns False when a concurrent payment or settlement got there first.
+    """
+    result = await db.execute(
+        update(ExpenseSplit).where(
+            ExpenseSplit.id == split.id,
+            ExpenseSplit.is_settled == False,
+            ExpenseSplit.amount_paid_cents == split.amount_paid_cents
+        ).values(
+            amount_paid_cents=paid_cents,
+            is_settled=settled,
+            settled_at=now if settled else None
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
 @router.post("/{expense_id}/pay")
 async def pay_expense_split(
     expense_id: int,
     amount: float = Query(..., gt=0, description="Amount to pay"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Pay towards an expense split."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    # Query floats accept "inf", which the gt check lets through
+    if not math.isfinite(amount):
+        raise HTTPException(status_code=422, detail="Amount must be a finite number")
+    amount_cents = to_cents(amount)
+    if amount_cents <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be at least 0.01")
+    
+    result = await db.execute(select(Expense).filter(Expense.id == expense_id))
+    expense = result.scalars().first()
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
     # Find user's split for this expense
-    split = db.query(ExpenseSplit).filter(
-        ExpenseSplit.expense_id == expense_id,
-        ExpenseSplit.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(ExpenseSplit).filter(
+            ExpenseSplit.expense_id == expense_id,
+            ExpenseSplit.user_id == current_user.id
+        )
+    )
+    split = result.scalars().first()
     
     if split is None:
         raise HTTPException(status_code=404, detail="Expense split not found")
@@ -197,26 +415,38 @@ async def pay_expense_split(
     if split.is_settled:
         raise HTTPException(status_code=400, detail="This split is already settled")
     
-    # Update payment
-    split.amount_paid += amount
-    
-    # Check if fully paid
-    if split.amount_paid >= split.amount_owed:
-        split.is_settled = True
-        split.settled_at = datetime.utcnow()
-        
-        # If split overpaid, adjust to exact amount
-        if split.amount_paid > split.amount_owed:
-            split.amount_paid = split.amount_owed
+    # Apply the payment only to the split as it was read; a concurrent payment
+    # that got there first leaves nothing to update
+    # Overpayments are capped at what the split owes
+    now = datetime.utcnow()
+    outstanding_before = ledger.outstanding(split)
+    paid_cents = min(split.amount_paid_cents + amount_cents, split.amount_owed_cents)
+    settled = paid_cents >= split.amount_owed_cents
+    if not await _update_open_split(db, split, paid_cents, settled, now):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Another payment on this split was just recorded; try again")
+    set_committed_value(split, "amount_paid_cents", paid_cents)
+    if settled:
+        set_committed_value(split, "is_settled", True)
+        set_committed_value(split, "settled_at", now)
     
-    db.commit()
+    deltas = ledger.new_deltas()
+    ledger.add_delta(deltas, split.user_id, expense.created_by_id, ledger.outstanding(split) - outstanding_before)
+    await ledger.apply_deltas(db, deltas)
     
-    # Check if all splits are settled
-    all_settled = all(s.is_settled for s in expense.splits)
-    if all_settled and expense.status != "settled":
-        expense.status = "settled"
-        expense.settled_at = datetime.utcnow()
-        db.commit()
+    # Settle the expense once no split is left open, checked in the same transaction
+    result = await db.execute(
+        update(Expense).where(
+            Expense.id == expense_id,
+            Expense.status != "settled",
+            ~select(ExpenseSplit.id).filter(
+                ExpenseSplit.expense_id == expense_id,
+                ExpenseSplit.is_settled == False
+            ).exists()
+        ).values(status="settled", settled_at=now).execution_options(synchronize_session=False)
+    )
+    all_settled = result.rowcount == 1 or expense.status == "settled"
+    await db.commit()
     
     return {
         "message": "Payment recorded successfully",
@@ -230,10 +460,16 @@ async def pay_expense_split(
 async def delete_expense(
     expense_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an expense (only by creator and only if no payments made)."""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    result = await db.execute(
+        select(Expense).options(
+            selectinload(Expense.participants),
+            selectinload(Expense.splits)
+        ).filter(Expense.id == expense_id)
+    )
+    expense = result.scalars().first()
     if expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
@@ -242,14 +478,19 @@ async def delete_expense(
         raise HTTPException(status_code=403, detail="Not authorized to delete this expense")
     
     # Check if any payments have been made
-    any_payments = any(split.amount_paid > 0 for split in expense.splits)
+    any_payments = any(split.amount_paid_cents > 0 for split in expense.splits)
     if any_payments:
         raise HTTPException(status_code=400, detail="Cannot delete expense with payments made")
     
+    deltas = ledger.new_deltas()
+    for split in expense.splits:
+        ledger.add_delta(deltas, split.user_id, expense.created_by_id, -ledger.outstanding(split))
+    await ledger.apply_deltas(db, deltas)
+    
     # Delete splits first
-    db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense_id).delete()
+    await db.execute(delete(ExpenseSplit).where(ExpenseSplit.expense_id == expense_id))
     
     # Delete expense
-    db.delete(expense)
-    db.commit()
+    await db.delete(expense)
+    await db.commit()
     return {"message": "Expense deleted successfully"}
\ No newline at end of file
@@ -1,60 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from ..database import get_db
-from ..models import User, Idea
+from ..models import User, Idea, IdeaVote
 from ..schemas import Idea as IdeaSchema, IdeaCreate, IdeaUpdate
 from ..auth import get_current_active_user
+from ..queries import idea_query
+from ..pagination import paginate, set_next_cursor
+from ..vote_buffer import vote_buffer
+from ..http_cache import conditional
 
 router = APIRouter()
 
+# Counter column for each vote type
+VOTE_COLUMNS = {"up": Idea.votes_up, "down": Idea.votes_down}
+
+# Times a vote is re-read and reapplied when concurrent changes keep winning
+VOTE_ATTEMPTS = 3
+
+async def _commit_vote(db: AsyncSession, idea_id: int, deltas: dict):
+    """Commit a vote change with its counter deltas and return the current counts.
+    
+    Counters are adjusted in SQL so concurrent votes never overwrite each other,
+    or handed to the write-behind buffer after commit when it is enabled.
+    """
+    if deltas and vote_buffer is None:
+        await db.execute(
+            update(Idea).where(Idea.id == idea_id).values(
+                {VOTE_COLUMNS[vote_type]: VOTE_COLUMNS[vote_type] + delta for vote_type, delta in deltas.items()}
+            ).execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    if deltas and vote_buffer is not None:
+        vote_buffer.add(idea_id, deltas)
+    
+    result = await db.execute(select(Idea.votes_up, Idea.votes_down).filter(Idea.id == idea_id))
+    votes_up, votes_down = result.one()
+    if vote_buffer is not None:
+        pending = vote_buffer.pending(idea_id)
+        votes_up += pending["up"]
+        votes_down += pending["down"]
+    return votes_up, votes_down
+
+async def _record_vote(db: AsyncSession, idea_id: int, user_id: int, vote_type: str) -> dict:
+    """Insert or change a user's vote and return the counter deltas it causes."""
+    for _ in range(VOTE_ATTEMPTS):
+        result = await db.execute(
+            select(IdeaVote).filter(IdeaVote.idea_id == idea_id, IdeaVote.user_id == user_id)
+        )
+        vote = result.scalars().first()
+        if vote is None:
+            db.add(IdeaVote(idea_id=idea_id, user_id=user_id, vote_type=vote_type))
+            await db.flush()
+            return {vote_type: 1}
+        if vote.vote_type == vote_type:
+            return {}
+        previous = vote.vote_type
+        result = await db.execute(
+            update(IdeaVote).where(
+                IdeaVote.id == vote.id,
+                IdeaVote.vote_type == previous
+            ).values(vote_type=vote_type).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return {previous: -1, vote_type: 1}
+        # A concurrent request changed or retracted this vote first; start over from what it left
+        db.expunge(vote)
+    await db.rollback()
+    raise HTTPException(status_code=409, detail="This vote was just changed; try again")
+
 @router.post("/", response_model=IdeaSchema)
 async def create_idea(
     idea: IdeaCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new idea."""
     db_idea = Idea(
         title=idea.title,
         description=idea.description,
         category=idea.category,
-        author_id=current_user.id
+        author_id=current_user.id,
+        author=current_user
     )
     db.add(db_idea)
-    db.commit()
-    db.refresh(db_idea)
+    await db.commit()
     return db_idea
 
 @router.get("/", response_model=List[IdeaSchema])
 async def read_ideas(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of ideas with optional filters."""
-    query = db.query(Idea)
+    not_modified = await conditional(request, response, db, ("ideas", "users"))
+    if not_modified is not None:
+        return not_modified
+    
+    query = idea_query()
     
     if category:
         query = query.filter(Idea.category == category)
     if status:
         query = query.filter(Idea.status == status)
     
-    ideas = query.order_by(Idea.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(paginate(query, Idea, skip, limit, cursor))
+    ideas = result.scalars().all()
+    set_next_cursor(response, ideas, limit)
     return ideas
 
 @router.get("/{idea_id}", response_model=IdeaSchema)
 async def read_idea(
     idea_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get idea by ID."""
-    idea = db.query(Idea).filter(Idea.id == idea_id).first()
+    # Votes and edits move updated_at, so the row tag only needs the author's table
+    result = await db.execute(select(Idea.updated_at).filter(Idea.id == idea_id))
+    not_modified = await conditional(request, response, db, ("users",), result.scalar())
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(idea_query().filter(Idea.id == idea_id))
+    idea = result.scalars().first()
     if idea is None:
         raise HTTPException(status_code=404, detail="Idea not found")
     return idea
@@ -64,10 +145,11 @@ async def update_idea(
     idea_id: int,
     idea_update: IdeaUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an idea (only by author)."""
-    idea = db.query(Idea).filter(Idea.id == idea_id).first()
+    result = await db.execute(idea_query().filter(Idea.id == idea_id))
+    idea = result.scalars().first()
     if idea is None:
         raise HTTPException(status_code=404, detail="Idea not found")
     
@@ -78,8 +160,7 @@ async def update_idea(
     for field, value in idea_update.dict(exclude_unset=True).items():
         setattr(idea, field, value)
     
-    db.commit()
-    db.refresh(idea)
+    await db.commit()
     return idea
 
 @router.post("/{idea_id}/vote")
@@ -87,30 +168,62 @@ async def vote_idea(
     idea_id: int,
     vote_type: str = Query(..., regex="^(up|down)$"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Vote on an idea."""
-    idea = db.query(Idea).filter(Idea.id == idea_id).first()
-    if idea is None:
+    """Vote on an idea; voting again replaces the user's previous vote."""
+    result = await db.execute(select(Idea.id).filter(Idea.id == idea_id))
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Idea not found")
     
-    # Update vote count
-    if vote_type == "up":
-        idea.votes_up += 1
-    else:
-        idea.votes_down += 1
+    user_id = current_user.id
+    try:
+        deltas = await _record_vote(db, idea_id, user_id, vote_type)
+    except IntegrityError:
+        # A concurrent request inserted this user's vote first; retry as a change
+        await db.rollback()
+        deltas = await _record_vote(db, idea_id, user_id, vote_type)
     
-    db.commit()
-    return {"message": f"Vote {vote_type} recorded", "votes_up": idea.votes_up, "votes_down": idea.votes_down}
+    votes_up, votes_down = await _commit_vote(db, idea_id, deltas)
+    return {"message": f"Vote {vote_type} recorded", "votes_up": votes_up, "votes_down": votes_down}
+
+@router.delete("/{idea_id}/vote")
+async def retract_vote(
+    idea_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Retract the current user's vote on an idea."""
+    result = await db.execute(
+        select(IdeaVote).filter(IdeaVote.idea_id == idea_id, IdeaVote.user_id == current_user.id)
+    )
+    vote = result.scalars().first()
+    if vote is None:
+        raise HTTPException(status_code=404, detail="Vote not found")
+    
+    result = await db.execute(
+        delete(IdeaVote).where(
+            IdeaVote.idea_id == idea_id,
+            IdeaVote.user_id == current_user.id,
+            IdeaVote.vote_type == vote.vote_type
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        # A concurrent request retracted or changed this vote first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="This vote was just changed; try again")
+    
+    votes_up, votes_down = await _commit_vote(db, idea_id, {vote.vote_type: -1})
+    return {"message": "Vote retracted", "votes_up": votes_up, "votes_down": votes_down}
 
 @router.delete("/{idea_id}")
 async def delete_idea(
     idea_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an idea (only by author)."""
-    idea = db.query(Idea).filter(Idea.id == idea_id).first()
+    result = await db.execute(idea_query().filter(Idea.id == idea_id))
+    idea = result.scalars().first()
     if idea is None:
         raise HTTPException(status_code=404, detail="Idea not found")
     
@@ -118,6 +231,9 @@ async def delete_idea(
     if idea.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this idea")
     
-    db.delete(idea)
-    db.commit()
+    # Delete votes first
+    await db.execute(delete(IdeaVote).where(IdeaVote.idea_id == idea_id))
+    
+    await db.delete(idea)
+    await db.commit()
     return {"message": "Idea deleted successfully"}
\ No newline at end of file
@@ -1,20 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import DateTime, and_, delete, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from ..database import get_db
-from ..models import User, MarketplaceItem
-from ..schemas import MarketplaceItem as MarketplaceItemSchema, MarketplaceItemCreate, MarketplaceItemUpdate
+from ..models import User, MarketplaceItem, Reservation
+from ..schemas import (
+    MarketplaceItem as MarketplaceItemSchema, MarketplaceItemCreate, MarketplaceItemUpdate,
+    Reservation as ReservationSchema, ReservationCreate
+)
 from ..auth import get_current_active_user
+from ..queries import item_query
+from ..pagination import paginate, set_next_cursor
+from ..http_cache import conditional
 
 router = APIRouter()
 
+# Tables an item response is built from
+ITEM_TABLES = ("marketplace_items", "users")
+
+def _utc_naive(value: datetime) -> datetime:
+    """Normalise to naive UTC, the form every timestamp column uses."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _overlapping(item_id, starts_at: datetime, ends_at: datetime):
+    """Reservations of an item that intersect [starts_at, ends_at)."""
+    return and_(
+        Reservation.item_id == item_id,
+        Reservation.starts_at < ends_at,
+        Reservation.ends_at > starts_at
+    )
+
+async def _reserve(
+    db: AsyncSession, item_id: int, user_id: int, starts_at: datetime, ends_at: datetime,
+    ignore_own: bool = False
+) -> bool:
+    """Book an item unless the period is taken; the overlap check runs inside the INSERT.
+
+    With ignore_own, the user's own bookings do not count as conflicts, so a
+    borrower can pick up an item they reserved.
+    """
+    # Row lock that serialises bookings of one item where the database has
+    # row locks; SQLite already runs writes one at a time
+    await db.execute(select(MarketplaceItem.id).filter(MarketplaceItem.id == item_id).with_for_update())
+    conflict = _overlapping(item_id, starts_at, ends_at)
+    if ignore_own:
+        conflict = and_(conflict, Reservation.user_id != user_id)
+    result = await db.execute(
+        insert(Reservation).from_select(
+            ["item_id", "user_id", "starts_at", "ends_at", "created_at"],
+            select(
+                literal(item_id),
+                literal(user_id),
+                literal(starts_at, DateTime),
+                literal(ends_at, DateTime),
+                literal(datetime.utcnow(), DateTime)
+            ).where(~select(Reservation.id).filter(conflict).exists())
+        )
+    )
+    return result.rowcount == 1
+
 @router.post("/", response_model=MarketplaceItemSchema)
 async def create_item(
     item: MarketplaceItemCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new marketplace item."""
     db_item = MarketplaceItem(
@@ -25,69 +78,131 @@ async def create_item(
         condition=item.condition,
         duration_max=item.duration_max,
         price_per_day=item.price_per_day,
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        owner=current_user
     )
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
     return db_item
 
 @router.get("/", response_model=List[MarketplaceItemSchema])
 async def read_items(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
     category: Optional[str] = Query(None, description="Filter by category"),
     item_type: Optional[str] = Query(None, description="Filter by item type"),
     available_only: bool = Query(True, description="Show only available items"),
-    db: Session = Depends(get_db),
+    free_from: Optional[datetime] = Query(None, description="With free_to, show only items with no booking or loan in this period"),
+    free_to: Optional[datetime] = Query(None, description="End of the free period (exclusive)"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of marketplace items with optional filters."""
-    query = db.query(MarketplaceItem)
+    # A free-period filter also depends on the bookings
+    tables = ITEM_TABLES + ("reservations",) if free_from or free_to else ITEM_TABLES
+    not_modified = await conditional(request, response, db, tables)
+    if not_modified is not None:
+        return not_modified
+    
+    query = item_query()
     
     if category:
         query = query.filter(MarketplaceItem.category == category)
     if item_type:
         query = query.filter(MarketplaceItem.item_type == item_type)
-    if available_only:
+    if free_from or free_to:
+        if not (free_from and free_to):
+            raise HTTPException(status_code=400, detail="free_from and free_to must be given together")
+        free_from, free_to = _utc_naive(free_from), _utc_naive(free_to)
+        if free_to <= free_from:
+            raise HTTPException(status_code=400, detail="free_to must be after free_from")
+        # A loan is only booked until return_by, so an item still out must be due back
+        # before the period starts, and not already overdue
+        now = datetime.utcnow()
+        query = query.filter(or_(
+            MarketplaceItem.current_borrower_id.is_(None),
+            and_(MarketplaceItem.return_by <= free_from, MarketplaceItem.return_by > now)
+        ))
+        if available_only:
+            # Items on loan are unavailable only until returned; others were withdrawn
+            query = query.filter(or_(
+                MarketplaceItem.availability == True,
+                MarketplaceItem.current_borrower_id.isnot(None)
+            ))
+        # One index probe per candidate item, stopping once the page is full
+        query = query.filter(~select(Reservation.id).filter(
+            _overlapping(MarketplaceItem.id, free_from, free_to)
+        ).exists())
+    elif available_only:
         query = query.filter(MarketplaceItem.availability == True)
     
-    items = query.order_by(MarketplaceItem.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(paginate(query, MarketplaceItem, skip, limit, cursor))
+    items = result.scalars().all()
+    set_next_cursor(response, items, limit)
     return items
 
 @router.get("/my-items", response_model=List[MarketplaceItemSchema])
 async def read_my_items(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's marketplace items."""
-    items = db.query(MarketplaceItem).filter(
-        MarketplaceItem.owner_id == current_user.id
-    ).order_by(MarketplaceItem.created_at.desc()).offset(skip).limit(limit).all()
+    not_modified = await conditional(request, response, db, ITEM_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    query = item_query().filter(MarketplaceItem.owner_id == current_user.id)
+    result = await db.execute(paginate(query, MarketplaceItem, skip, limit, cursor))
+    items = result.scalars().all()
+    set_next_cursor(response, items, limit)
     return items
 
 @router.get("/borrowed", response_model=List[MarketplaceItemSchema])
 async def read_borrowed_items(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get items currently borrowed by the user."""
-    items = db.query(MarketplaceItem).filter(
-        MarketplaceItem.current_borrower_id == current_user.id,
-        MarketplaceItem.availability == False
-    ).all()
+    not_modified = await conditional(request, response, db, ITEM_TABLES, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(
+        item_query().filter(
+            MarketplaceItem.current_borrower_id == current_user.id,
+            MarketplaceItem.availability == False
+        )
+    )
+    items = result.scalars().all()
     return items
 
 @router.get("/{item_id}", response_model=MarketplaceItemSchema)
 async def read_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get marketplace item by ID."""
-    item = db.query(MarketplaceItem).filter(MarketplaceItem.id == item_id).first()
+    # Edits, loans and the overdue sweep all move updated_at
+    result = await db.execute(select(MarketplaceItem.updated_at).filter(MarketplaceItem.id == item_id))
+    not_modified = await conditional(request, response, db, ("users",), result.scalar())
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(item_query().filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
@@ -97,10 +212,11 @@ async def update_item(
     item_id: int,
     item_update: MarketplaceItemUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a marketplace item (only by owner)."""
-    item = db.query(MarketplaceItem).filter(MarketplaceItem.id == item_id).first()
+    result = await db.execute(item_query().filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -111,8 +227,7 @@ async def update_item(
     for field, value in item_update.dict(exclude_unset=True).items():
         setattr(item, field, value)
     
-    db.commit()
-    db.refresh(item)
+    await db.commit()
     return item
 
 @router.post("/{item_id}/borrow")
@@ -120,10 +235,11 @@ async def borrow_item(
     item_id: int,
     days: int = Query(..., ge=1, description="Number of days to borrow"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Borrow an item."""
-    item = db.query(MarketplaceItem).filter(MarketplaceItem.id == item_id).first()
+    result = await db.execute(item_query().filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -143,27 +259,119 @@ async def borrow_item(
     if item.item_type not in ["lend", "both"]:
         raise HTTPException(status_code=400, detail="This item is not available for lending")
     
-    # Update item status
-    item.availability = False
-    item.current_borrower_id = current_user.id
-    item.borrowed_at = datetime.utcnow()
-    item.return_by = datetime.utcnow() + timedelta(days=days)
+    # Claim the item only if it is still available; a concurrent borrower that
+    # got there first leaves nothing to update
+    now = datetime.utcnow()
+    return_by = now + timedelta(days=days)
+    result = await db.execute(
+        update(MarketplaceItem).where(
+            MarketplaceItem.id == item_id,
+            MarketplaceItem.availability == True
+        ).values(
+            availability=False,
+            current_borrower_id=current_user.id,
+            borrowed_at=now,
+            return_by=return_by,
+            updated_at=now
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Item was just borrowed by someone else")
+    if not await _reserve(db, item_id, current_user.id, now, return_by, ignore_own=True):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Item is reserved during that period")
     
-    db.commit()
+    await db.commit()
     return {
         "message": "Item borrowed successfully",
-        "return_by": item.return_by,
+        "return_by": return_by,
         "total_cost": item.price_per_day * days if item.price_per_day > 0 else 0
     }
 
+@router.get("/{item_id}/reservations", response_model=List[ReservationSchema])
+async def read_item_reservations(
+    item_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get an item's current and upcoming reservations, soonest first."""
+    result = await db.execute(
+        select(Reservation).filter(
+            Reservation.item_id == item_id,
+            Reservation.ends_at > datetime.utcnow()
+        ).order_by(Reservation.starts_at)
+    )
+    return result.scalars().all()
+
+@router.post("/{item_id}/reservations", response_model=ReservationSchema)
+async def reserve_item(
+    item_id: int,
+    reservation: ReservationCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Book an item for a future period."""
+    result = await db.execute(select(MarketplaceItem).filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    
+    starts_at, ends_at = _utc_naive(reservation.starts_at), _utc_naive(reservation.ends_at)
+    if ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="ends_at must be after starts_at")
+    if ends_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Reservation is in the past")
+    if item.owner_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot borrow your own item")
+    if item.item_type not in ["lend", "both"]:
+        raise HTTPException(status_code=400, detail="This item is not available for lending")
+    if item.duration_max and ends_at - starts_at > timedelta(days=item.duration_max):
+        raise HTTPException(status_code=400, detail=f"Cannot borrow for more than {item.duration_max} days")
+    
+    if not await _reserve(db, item_id, current_user.id, starts_at, ends_at):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Item is already reserved during that period")
+    await db.commit()
+    
+    result = await db.execute(
+        select(Reservation).filter(
+            Reservation.item_id == item_id,
+            Reservation.user_id == current_user.id,
+            Reservation.starts_at == starts_at,
+            Reservation.ends_at == ends_at
+        ).order_by(Reservation.id.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+@router.delete("/reservations/{reservation_id}")
+async def cancel_reservation(
+    reservation_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cancel one of your reservations before it starts."""
+    reservation = await db.get(Reservation, reservation_id)
+    if reservation is None:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    if reservation.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to cancel this reservation")
+    if reservation.starts_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Reservation has already started")
+    
+    await db.delete(reservation)
+    await db.commit()
+    return {"message": "Reservation cancelled successfully"}
+
 @router.post("/{item_id}/return")
 async def return_item(
     item_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Return a borrowed item."""
-    item = db.query(MarketplaceItem).filter(MarketplaceItem.id == item_id).first()
+    result = await db.execute(item_query().filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -171,23 +379,47 @@ async def return_item(
     if item.current_borrower_id != current_user.id:
         raise HTTPException(status_code=403, detail="You are not the current borrower of this item")
     
-    # Return the item
-    item.availability = True
-    item.current_borrower_id = None
-    item.borrowed_at = None
-    item.return_by = None
+    # Return the item, unless a concurrent request already did
+    result = await db.execute(
+        update(MarketplaceItem).where(
+            MarketplaceItem.id == item_id,
+            MarketplaceItem.current_borrower_id == current_user.id
+        ).values(
+            availability=True,
+            current_borrower_id=None,
+            borrowed_at=None,
+            return_by=None,
+            overdue_at=None,
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Item has already been returned")
+    
+    # Free the rest of the booking that covered this loan
+    now = datetime.utcnow()
+    await db.execute(
+        update(Reservation).where(
+            Reservation.item_id == item_id,
+            Reservation.user_id == current_user.id,
+            Reservation.starts_at <= now,
+            Reservation.ends_at > now
+        ).values(ends_at=now).execution_options(synchronize_session=False)
+    )
     
-    db.commit()
+    await db.commit()
     return {"message": "Item returned successfully"}
 
 @router.delete("/{item_id}")
 async def delete_item(
     item_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a marketplace item (only by owner)."""
-    item = db.query(MarketplaceItem).filter(MarketplaceItem.id == item_id).first()
+    result = await db.execute(item_query().filter(MarketplaceItem.id == item_id))
+    item = result.scalars().first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
@@ -199,6 +431,7 @@ async def delete_item(
     if not item.availability:
         raise HTTPException(status_code=400, detail="Cannot delete item that is currently borrowed")
     
-    db.delete(item)
-    db.commit()
+    await db.execute(delete(Reservation).where(Reservation.item_id == item_id))
+    await db.delete(item)
+    await db.commit()
     return {"message": "Item deleted successfully"}
\ No newline at end of file
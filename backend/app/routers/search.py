@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ..database import get_db
+from ..models import User, Idea, Alert, MarketplaceItem
+from ..schemas import SearchResult
+from ..auth import get_current_active_user
+from ..search import SEARCH_SOURCES, decode_rowid, fts_query, search_statement
+from ..http_cache import conditional
+
+router = APIRouter()
+
+SEARCH_MODELS = {"idea": Idea, "alert": Alert, "item": MarketplaceItem}
+
+async def _search_like(db: AsyncSession, kinds: List[str], q: str, skip: int, limit: int):
+    """Unranked substring search for databases without FTS5."""
+    pattern = f"%{q}%"
+    results = []
+    for kind in kinds:
+        model = SEARCH_MODELS[kind]
+        result = await db.execute(
+            select(model.id, model.title, model.description).filter(
+                or_(model.title.ilike(pattern), model.description.ilike(pattern))
+            ).order_by(model.created_at.desc()).limit(skip + limit)
+        )
+        results.extend(
+            SearchResult(type=kind, id=row.id, title=row.title, snippet=row.description[:160], score=0.0)
+            for row in result
+        )
+    return results[skip:skip + limit]
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, description="Search text"),
+    types: Optional[str] = Query(None, description="Comma-separated kinds: idea, alert, item"),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Search ideas, alerts and marketplace items, best matches first."""
+    kinds = [kind.strip() for kind in types.split(",")] if types else list(SEARCH_SOURCES)
+    if any(kind not in SEARCH_SOURCES for kind in kinds):
+        raise HTTPException(status_code=400, detail="types must be a subset of idea, alert, item")
+    
+    query = fts_query(q)
+    if query is None:
+        return []
+    not_modified = await conditional(request, response, db, ("ideas", "alerts", "marketplace_items"))
+    if not_modified is not None:
+        return not_modified
+    if db.bind.dialect.name != "sqlite":
+        return await _search_like(db, kinds, q, skip, limit)
+    
+    result = await db.execute(search_statement(kinds), {"query": query, "limit": limit, "skip": skip})
+    results = []
+    for row in result:
+        kind, source_id = decode_rowid(row.rowid)
+        # bm25 scores are negative; flip them so higher means more relevant
+        results.append(SearchResult(type=kind, id=source_id, title=row.title, snippet=row.snippet, score=-row.score))
+    return results
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from ..database import get_db
 from ..models import User
 from ..schemas import User as UserSchema, UserUpdate
 from ..auth import get_current_active_user
+from ..pagination import paginate, set_next_cursor
+from ..http_cache import conditional
 
 router = APIRouter()
 
@@ -18,35 +21,51 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 async def update_user_me(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user's profile."""
     for field, value in user_update.dict(exclude_unset=True).items():
         setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
     return current_user
 
 @router.get("/", response_model=List[UserSchema])
 async def read_users(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; replaces skip"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of users."""
-    users = db.query(User).filter(User.is_active == True).offset(skip).limit(limit).all()
+    not_modified = await conditional(request, response, db, ("users",))
+    if not_modified is not None:
+        return not_modified
+    
+    query = select(User).filter(User.is_active == True)
+    result = await db.execute(paginate(query, User, skip, limit, cursor))
+    users = result.scalars().all()
+    set_next_cursor(response, users, limit)
     return users
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get user by ID."""
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    not_modified = await conditional(request, response, db, ("users",))
+    if not_modified is not None:
+        return not_modified
+    
+    result = await db.execute(select(User).filter(User.id == user_id, User.is_active == True))
+    user = result.scalars().first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .database import async_engine
+from .models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# Background scheduler configuration
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "90"))
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+
+leases_table = SchedulerLease.__table__
+
+class Job:
+    """A named coroutine run every interval seconds, with run counters."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[int]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.processed = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.last_run_at: Optional[datetime] = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_not_leader": self.skipped,
+            "rows_processed": self.processed,
+            "last_ms": self.last_ms,
+            "avg_ms": self.total_ms / self.runs if self.runs else 0.0,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+class Scheduler:
+    """Runs periodic jobs in whichever worker holds the scheduler lease.
+
+    Every worker starts a scheduler, but before each run it renews (or takes
+    over an expired) lease row in the database, and only the holder runs the
+    job. Workers and hosts sharing the database therefore never duplicate a
+    sweep; if the leader dies its lease expires and another worker takes over.
+    The leader renews the lease from a heartbeat task, so it is kept between
+    runs and during long ones. Intervals are jittered so workers do not poll
+    the lease in lockstep.
+    """
+
+    def __init__(self, name: str = "default", lease_seconds: int = 90, jitter: float = 0.1):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.jitter = jitter
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, interval: float, func: Callable[[], Awaitable[int]]) -> None:
+        """Register a job; func returns how many rows it processed."""
+        self.jobs[name] = Job(name, interval, func)
+        # The lease must outlast the longest jittered gap between runs
+        self.lease_seconds = max(self.lease_seconds, math.ceil(interval * (1 + self.jitter)) + 1)
+
+    async def hold_lease(self) -> bool:
+        """Renew or acquire the lease and return whether this worker holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                update(leases_table).where(
+                    leases_table.c.name == self.name,
+                    or_(leases_table.c.holder == self.holder, leases_table.c.expires_at < now)
+                ).values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount == 1:
+                return True
+            dialect_insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+            result = await conn.execute(
+                dialect_insert(leases_table).values(
+                    name=self.name, holder=self.holder, expires_at=expires_at
+                ).on_conflict_do_nothing(index_elements=["name"])
+            )
+            return result.rowcount == 1
+
+    async def release_lease(self) -> None:
+        """Give up the lease so another worker can take over immediately."""
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                update(leases_table).where(
+                    leases_table.c.name == self.name,
+                    leases_table.c.holder == self.holder
+                ).values(expires_at=datetime.utcnow())
+            )
+
+    async def run_job(self, job: Job) -> None:
+        """Run a job once if this worker is the leader, recording its timing."""
+        try:
+            self.is_leader = await self.hold_lease()
+            if not self.is_leader:
+                job.skipped += 1
+                return
+            started = time.perf_counter()
+            processed = await job.func()
+            job.last_ms = (time.perf_counter() - started) * 1000
+        except Exception:
+            job.failures += 1
+            logger.exception("Scheduled job %s failed", job.name)
+            return
+        job.runs += 1
+        job.total_ms += job.last_ms
+        job.processed += processed or 0
+        job.last_run_at = datetime.utcnow()
+        if processed:
+            logger.info("Scheduled job %s processed %d rows in %.1f ms", job.name, processed, job.last_ms)
+
+    def _delay(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _loop(self, job: Job) -> None:
+        # Spread first runs so jobs and workers do not all start together
+        await asyncio.sleep(random.uniform(0, self.jitter * job.interval))
+        while True:
+            await self.run_job(job)
+            await asyncio.sleep(self._delay(job.interval))
+
+    async def _heartbeat(self) -> None:
+        # Renew well before expiry so a slow database round trip cannot lose the lease
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.is_leader:
+                continue
+            try:
+                self.is_leader = await self.hold_lease()
+            except Exception:
+                logger.exception("Could not renew scheduler lease")
+            if not self.is_leader:
+                logger.warning("Scheduler lease %s was taken over by another worker", self.name)
+
+    def start(self) -> None:
+        """Start one task per job and the lease heartbeat."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+            self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        """Cancel the job tasks and hand the lease back."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self.is_leader = False
+        try:
+            await self.release_lease()
+        except Exception:
+            logger.exception("Could not release scheduler lease")
+
+    def stats(self) -> dict:
+        """Return per-job counters for monitoring."""
+        return {name: job.stats() for name, job in self.jobs.items()}
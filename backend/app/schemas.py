@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, Field, validator
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
@@ -127,16 +127,30 @@ class MarketplaceItem(MarketplaceItemBase):
     current_borrower_id: Optional[int] = None
     borrowed_at: Optional[datetime] = None
     return_by: Optional[datetime] = None
+    overdue_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+class ReservationCreate(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+
+class Reservation(ReservationCreate):
+    id: int
+    item_id: int
+    user_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Expense schemas
 class ExpenseSplitBase(BaseModel):
     user_id: int
-    amount_owed: float
+    amount_owed: float = Field(allow_inf_nan=False)
 
 class ExpenseSplitCreate(ExpenseSplitBase):
     pass
@@ -154,7 +168,7 @@ class ExpenseSplit(ExpenseSplitBase):
 class ExpenseBase(BaseModel):
     title: str
     description: Optional[str] = None
-    total_amount: float
+    total_amount: float = Field(allow_inf_nan=False)
     category: str
     split_type: str = "equal"
     due_date: Optional[datetime] = None
@@ -166,7 +180,7 @@ class ExpenseCreate(ExpenseBase):
 class ExpenseUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    total_amount: Optional[float] = None
+    total_amount: Optional[float] = Field(None, allow_inf_nan=False)
     category: Optional[str] = None
     status: Optional[str] = None
     due_date: Optional[datetime] = None
@@ -179,7 +193,63 @@ class Expense(ExpenseBase):
     participants: List[User]
     splits: List[ExpenseSplit]
     created_at: datetime
+    overdue_at: Optional[datetime] = None
     settled_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CounterpartyBalance(BaseModel):
+    user: User
+    amount: float  # positive: they owe you, negative: you owe them
+
+class BalanceSummary(BaseModel):
+    owes: float
+    owed: float
+    net: float
+    counterparties: List[CounterpartyBalance]
+
+class SettlementTransfer(BaseModel):
+    from_user_id: int
+    to_user_id: int
+    amount: float
+
+# Dashboard schemas
+class DashboardItem(BaseModel):
+    id: int
+    title: str
+    category: str
+    item_type: str
+    availability: bool
+    price_per_day: float
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class DashboardExpense(BaseModel):
+    id: int
+    title: str
+    category: str
+    total_amount: float
+    status: str
+    due_date: Optional[datetime] = None
+    overdue_at: Optional[datetime] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class Dashboard(BaseModel):
+    ideas: List[Idea]
+    active_alerts: List[Alert]
+    marketplace_items: List[DashboardItem]
+    expenses: List[DashboardExpense]
+
+# Search schemas
+class SearchResult(BaseModel):
+    type: str  # idea, alert, item
+    id: int
+    title: str
+    snippet: str
+    score: float
\ No newline at end of file
@@ -0,0 +1,95 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, inspect, text
+
+from .models import Base
+
+# Ideas, alerts and marketplace items share one FTS5 index. Each document's
+# rowid encodes its source as id * KIND_SLOTS + kind code, so triggers can
+# update or delete a single document by rowid instead of scanning the index.
+KIND_SLOTS = 4
+SEARCH_SOURCES = {
+    # kind: (code, table, title expression, body expression, watched columns)
+    "idea": (1, "ideas", "{row}.title", "{row}.description", "title, description"),
+    "alert": (2, "alerts", "{row}.title", "{row}.description || ' ' || {row}.location", "title, description, location"),
+    "item": (3, "marketplace_items", "{row}.title", "{row}.description", "title, description"),
+}
+KIND_BY_CODE = {code: kind for kind, (code, *_) in SEARCH_SOURCES.items()}
+
+def _source_ddl(code: int, table: str, title: str, body: str, columns: str) -> List[str]:
+    insert = (
+        f"INSERT INTO search_index(rowid, title, body) "
+        f"VALUES (new.id * {KIND_SLOTS} + {code}, {title.format(row='new')}, {body.format(row='new')});"
+    )
+    delete = f"DELETE FROM search_index WHERE rowid = old.id * {KIND_SLOTS} + {code};"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+        f"BEGIN {delete} END",
+    ]
+
+def install_search_index(connection) -> None:
+    """Create the FTS5 index and its sync triggers, indexing existing rows once."""
+    if connection.dialect.name != "sqlite":
+        return
+    created = not inspect(connection).has_table("search_index")
+    if created:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE search_index USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        # Title matches weigh twice as much as body matches
+        connection.exec_driver_sql(
+            "INSERT INTO search_index(search_index, rank) VALUES ('rank', 'bm25(2.0, 1.0)')"
+        )
+    for code, table, title, body, columns in SEARCH_SOURCES.values():
+        for statement in _source_ddl(code, table, title, body, columns):
+            connection.exec_driver_sql(statement)
+        if created:
+            connection.exec_driver_sql(
+                f"INSERT INTO search_index(rowid, title, body) "
+                f"SELECT id * {KIND_SLOTS} + {code}, {title.format(row=table)}, {body.format(row=table)} "
+                f"FROM {table}"
+            )
+
+def drop_search_index(connection) -> None:
+    """Remove the FTS5 index and its triggers."""
+    if connection.dialect.name != "sqlite":
+        return
+    for _, table, *_ in SEARCH_SOURCES.values():
+        for action in ("insert", "update", "delete"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+def fts_query(terms: str) -> Optional[str]:
+    """Turn free text into an FTS5 query of quoted terms, all required.
+
+    Terms are matched whole (after porter stemming) rather than as prefixes;
+    a short prefix expands to thousands of terms and ranks far too slowly.
+    """
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
+
+def search_statement(kinds: List[str]):
+    """Ranked FTS5 lookup returning (rowid, title, score, snippet) rows."""
+    codes = ", ".join(str(SEARCH_SOURCES[kind][0]) for kind in kinds)
+    return text(
+        "SELECT rowid, title, rank AS score, "
+        "snippet(search_index, 1, '<b>', '</b>', '...', 16) AS snippet "
+        "FROM search_index WHERE search_index MATCH :query "
+        f"AND rowid % {KIND_SLOTS} IN ({codes}) "
+        "ORDER BY rank LIMIT :limit OFFSET :skip"
+    )
+
+def decode_rowid(rowid: int) -> Tuple[str, int]:
+    """Split an index rowid into (kind, source id)."""
+    return KIND_BY_CODE[rowid % KIND_SLOTS], rowid // KIND_SLOTS
@@ -0,0 +1,88 @@
+import heapq
+import os
+from typing import Dict, List, Tuple
+
+# Balances are in cents: positive means the user is owed money, negative that
+# they owe it. A plan is a list of (from_user_id, to_user_id, cents) transfers
+# that brings every balance to zero.
+
+# Up to this many non-zero balances the exact subset solver is used; its cost
+# grows as 2^n, while the greedy pass stays O(n log n) for any size
+EXACT_SOLVER_MAX_USERS = int(os.getenv("SETTLE_EXACT_MAX_USERS", "12"))
+
+Transfer = Tuple[int, int, int]
+
+def _greedy(balances: Dict[int, int]) -> List[Transfer]:
+    """Repeatedly pay the largest creditor from the largest debtor.
+
+    Each step zeroes at least one balance, so n balances need at most n - 1
+    transfers. Any imbalance left by rounding stays with the larger side.
+    """
+    creditors = [(-amount, user_id) for user_id, amount in balances.items() if amount > 0]
+    debtors = [(amount, user_id) for user_id, amount in balances.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+    transfers = []
+    while creditors and debtors:
+        credit, creditor_id = heapq.heappop(creditors)
+        debt, debtor_id = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor_id, creditor_id, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor_id))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor_id))
+    return transfers
+
+def _zero_sum_groups(balances: Dict[int, int]) -> List[List[int]]:
+    """Split users into the largest number of groups that each sum to zero.
+
+    A group of k users settles in k - 1 transfers, so maximising the number of
+    groups minimises the total. dp[mask] is the most zero-sum groups that the
+    users in mask can be partitioned into, counting a non-zero remainder as one.
+    """
+    users = list(balances)
+    amounts = [balances[user_id] for user_id in users]
+    size = 1 << len(users)
+    sums = [0] * size
+    dp = [0] * size
+    choice = [0] * size
+    for mask in range(1, size):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+        best, best_bit = -1, 0
+        remaining = mask
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            if dp[mask ^ bit] > best:
+                best, best_bit = dp[mask ^ bit], bit
+        dp[mask] = best + (1 if sums[mask] == 0 else 0)
+        choice[mask] = best_bit
+
+    # Walk back: a group closes whenever the running mask sums to zero
+    groups, current, mask = [], [], size - 1
+    while mask:
+        if sums[mask] == 0 and current:
+            groups.append(current)
+            current = []
+        bit = choice[mask]
+        current.append(users[bit.bit_length() - 1])
+        mask ^= bit
+    if current:
+        groups.append(current)
+    return groups
+
+def plan_settlement(balances: Dict[int, int]) -> List[Transfer]:
+    """Return a short list of transfers that settles all balances.
+
+    Small communities get a minimal plan from the exact solver; larger ones
+    get the greedy plan, which needs at most n - 1 transfers.
+    """
+    balances = {user_id: amount for user_id, amount in balances.items() if amount}
+    if len(balances) > EXACT_SOLVER_MAX_USERS:
+        return _greedy(balances)
+    transfers = []
+    for group in _zero_sum_groups(balances):
+        transfers.extend(_greedy({user_id: balances[user_id] for user_id in group}))
+    return transfers
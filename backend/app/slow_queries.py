@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Any
+
+from sqlalchemy import event
+
+from .cache import TTLCache
+from .database import sync_engines
+
+logger = logging.getLogger(__name__)
+
+# Slow-query log configuration; SLOW_QUERY_MS=0 turns it off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Parameter values may hold personal data, so only their shape is logged by default
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "false").lower() in ("1", "true", "yes")
+# A statement's plan is captured at most once per this many seconds
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "600"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Fingerprints whose plan was logged recently
+_explained = TTLCache(maxsize=1000, ttl=SLOW_QUERY_EXPLAIN_INTERVAL)
+
+slow_query_count = 0
+explain_failures = 0
+
+def normalize(statement: str) -> str:
+    """Collapse whitespace, literals and IN lists so variants of a query compare equal."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _LITERALS.sub("?", statement)
+    return _PLACEHOLDER_LISTS.sub("(...)", statement)
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:12]
+
+def describe_parameters(parameters: Any, executemany: bool) -> str:
+    """Summarize parameters by count, types and a hash of the values."""
+    if SLOW_QUERY_LOG_PARAMS:
+        return repr(parameters)
+    if executemany:
+        return f"{len(parameters)} rows"
+    values = list(parameters.values()) if isinstance(parameters, dict) else list(parameters or ())
+    types = ",".join(type(value).__name__ for value in values)
+    digest = hashlib.sha1(repr(values).encode()).hexdigest()[:12]
+    return f"{len(values)} values ({types}) sha1={digest}"
+
+def _explain(conn, statement: str, parameters: Any) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # A separate DBAPI cursor, so the statement being timed keeps its results
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are one text column
+    return "\n".join("    " + str(row[-1]) for row in rows)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global slow_query_count, explain_failures
+    elapsed_ms = (time.perf_counter() - context._slow_query_started) * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    slow_query_count += 1
+    query_id = fingerprint(statement)
+    plan = ""
+    is_select = statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+    if SLOW_QUERY_EXPLAIN and is_select and not executemany and _explained.get(query_id) is None:
+        _explained.set(query_id, True)
+        try:
+            plan = "\n  plan:\n" + _explain(conn, statement, parameters)
+        except Exception as exc:
+            explain_failures += 1
+            plan = f"\n  plan unavailable: {exc}"
+    logger.warning(
+        "Slow query %.1f ms [%s] %s\n  params: %s%s",
+        elapsed_ms, query_id, _WHITESPACE.sub(" ", statement).strip(),
+        describe_parameters(parameters, executemany), plan
+    )
+
+def stats() -> dict:
+    """Return slow-query counters for monitoring."""
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "slow_queries": slow_query_count,
+        "explain_failures": explain_failures,
+    }
+
+if SLOW_QUERY_MS > 0:
+    for _engine in sync_engines():
+        event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,115 @@
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import select, update
+
+from .broadcast import publish_alert
+from .database import AsyncSessionLocal
+from .models import Alert, Expense, MarketplaceItem
+from .queries import alert_query
+from .scheduler import SCHEDULER_ENABLED, SCHEDULER_JITTER, SCHEDULER_LEASE_SECONDS, Scheduler
+
+# Periodic sweeps for state that changes with the clock rather than a request.
+# Each sweep pages through matching ids with an index range scan and updates
+# them in batches, one short transaction per batch.
+SWEEP_INTERVAL_SECONDS = int(os.getenv("SWEEP_INTERVAL_SECONDS", "300"))
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", "500"))
+# Active alerts older than this are marked expired; 0 disables expiry
+ALERT_EXPIRY_HOURS = int(os.getenv("ALERT_EXPIRY_HOURS", "72"))
+
+async def _sweep(select_ids, apply: Callable[..., Awaitable[Optional[Callable[[], None]]]]) -> int:
+    """Apply an update to every id the query matches, a batch at a time.
+
+    apply must make the rows stop matching, so each batch picks up new ones.
+    It may return a callback, which runs once the batch is committed.
+    """
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select_ids.limit(SWEEP_BATCH_SIZE))
+            ids = result.scalars().all()
+            if ids:
+                after_commit = await apply(db, ids)
+                await db.commit()
+                if after_commit is not None:
+                    after_commit()
+        total += len(ids)
+        if len(ids) < SWEEP_BATCH_SIZE:
+            return total
+
+async def mark_overdue_items() -> int:
+    """Flag loans whose return_by has passed."""
+    now = datetime.utcnow()
+    overdue = (
+        MarketplaceItem.overdue_at.is_(None),
+        MarketplaceItem.return_by < now,
+        MarketplaceItem.availability == False
+    )
+
+    async def apply(db, ids: List[int]):
+        # Repeat the predicate, so a loan returned since the ids were read is left alone
+        await db.execute(
+            update(MarketplaceItem).where(
+                MarketplaceItem.id.in_(ids), *overdue
+            ).values(overdue_at=now).execution_options(synchronize_session=False)
+        )
+
+    # Range scan on ix_marketplace_items_overdue_at_return_by
+    return await _sweep(select(MarketplaceItem.id).filter(*overdue), apply)
+
+async def mark_overdue_expenses() -> int:
+    """Flag pending expenses whose due date has passed."""
+    now = datetime.utcnow()
+    overdue = (
+        Expense.status == "pending",
+        Expense.overdue_at.is_(None),
+        Expense.due_date < now
+    )
+
+    async def apply(db, ids: List[int]):
+        # Repeat the predicate, so an expense settled since the ids were read is left alone
+        await db.execute(
+            update(Expense).where(
+                Expense.id.in_(ids), *overdue
+            ).values(overdue_at=now).execution_options(synchronize_session=False)
+        )
+
+    # Range scan on ix_expenses_status_overdue_at_due_date
+    return await _sweep(select(Expense.id).filter(*overdue), apply)
+
+async def expire_alerts() -> int:
+    """Expire active alerts nobody has resolved within ALERT_EXPIRY_HOURS."""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(hours=ALERT_EXPIRY_HOURS)
+
+    async def apply(db, ids: List[int]):
+        await db.execute(
+            update(Alert).where(
+                Alert.id.in_(ids),
+                Alert.status == "active"
+            ).values(status="expired", resolved_at=now).execution_options(synchronize_session=False)
+        )
+        result = await db.execute(alert_query().filter(Alert.id.in_(ids)))
+        alerts = result.scalars().all()
+
+        def publish():
+            for alert in alerts:
+                publish_alert("alert_updated", alert)
+        return publish
+
+    # Range scan on ix_alerts_status_created_at_id
+    return await _sweep(
+        select(Alert.id).filter(Alert.status == "active", Alert.created_at < cutoff),
+        apply
+    )
+
+def build_scheduler() -> Scheduler:
+    scheduler = Scheduler("sweeps", SCHEDULER_LEASE_SECONDS, SCHEDULER_JITTER)
+    scheduler.add("overdue_items", SWEEP_INTERVAL_SECONDS, mark_overdue_items)
+    scheduler.add("overdue_expenses", SWEEP_INTERVAL_SECONDS, mark_overdue_expenses)
+    if ALERT_EXPIRY_HOURS > 0:
+        scheduler.add("expire_alerts", SWEEP_INTERVAL_SECONDS, expire_alerts)
+    return scheduler
+
+scheduler = build_scheduler() if SCHEDULER_ENABLED else None
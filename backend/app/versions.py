@@ -0,0 +1,58 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import UpdateBase
+
+from .database import async_engine
+from .models import TableVersion
+
+# Per-table change counters. Every INSERT, UPDATE or DELETE on a tracked table
+# marks the table on its connection, and when the transaction commits each
+# marked table's counter is bumped in that same transaction. A reader can then
+# tell whether anything changed since a version it saw with one primary key
+# lookup. The counters live in the database, so every worker sees them.
+
+versions_table = TableVersion.__table__
+
+# Tables that read endpoints serve, directly or as embedded objects
+TRACKED_TABLES = frozenset({
+    "users", "ideas", "alerts", "marketplace_items", "reservations",
+    "expenses", "expense_participants", "expense_splits",
+    "user_balances", "pair_balances",
+})
+
+_CHANGED_KEY = "changed_tables"
+
+def _record_write(conn, clauseelement, multiparams, params, execution_options, result):
+    if isinstance(clauseelement, UpdateBase) and clauseelement.table.name in TRACKED_TABLES:
+        conn.info.setdefault(_CHANGED_KEY, set()).add(clauseelement.table.name)
+
+def _bump_versions(conn):
+    tables = conn.info.pop(_CHANGED_KEY, None)
+    if not tables:
+        return
+    dialect_insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(versions_table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": versions_table.c.version + 1},
+    )
+    # Sorted so concurrent commits lock counter rows in the same order
+    conn.execute(statement, [{"name": name, "version": 1} for name in sorted(tables)])
+
+def _discard_changes(conn):
+    conn.info.pop(_CHANGED_KEY, None)
+
+event.listen(async_engine.sync_engine, "after_execute", _record_write)
+event.listen(async_engine.sync_engine, "commit", _bump_versions)
+event.listen(async_engine.sync_engine, "rollback", _discard_changes)
+
+async def table_versions(db, tables: Iterable[str]) -> Dict[str, int]:
+    """Return the current counter of each table; 0 if it was never written."""
+    tables = list(tables)
+    result = await db.execute(
+        select(versions_table.c.name, versions_table.c.version).where(versions_table.c.name.in_(tables))
+    )
+    versions = dict(result.all())
+    return {name: versions.get(name, 0) for name in tables}
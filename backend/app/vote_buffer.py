@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, select, update
+
+from .database import async_engine
+from .models import Idea, IdeaVote
+
+logger = logging.getLogger(__name__)
+
+# Write-behind vote buffer configuration
+VOTE_BUFFER_ENABLED = os.getenv("VOTE_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+VOTE_BUFFER_INTERVAL_MS = int(os.getenv("VOTE_BUFFER_INTERVAL_MS", "200"))
+
+ideas_table = Idea.__table__
+
+# One executemany statement applies the coalesced deltas of every idea
+_flush_statement = update(ideas_table).where(
+    ideas_table.c.id == bindparam("b_idea_id")
+).values(
+    votes_up=ideas_table.c.votes_up + bindparam("b_up"),
+    votes_down=ideas_table.c.votes_down + bindparam("b_down")
+)
+
+def _vote_count(vote_type: str):
+    return select(func.count()).where(
+        IdeaVote.idea_id == ideas_table.c.id, IdeaVote.vote_type == vote_type
+    ).scalar_subquery()
+
+def rebuild_counts_statement():
+    """UPDATE statement that recomputes every idea's vote counters from idea_votes."""
+    return update(ideas_table).values(votes_up=_vote_count("up"), votes_down=_vote_count("down"))
+
+class VoteBuffer:
+    """Coalesces vote counter deltas per idea and writes them in batches.
+
+    Vote rows are still committed by the request, so counters can always be
+    rebuilt from idea_votes with rebuild_counts_statement(); only counter
+    updates are deferred. Pending deltas
+    are flushed every interval and once more on graceful shutdown.
+    """
+
+    def __init__(self, interval_ms: int = 200):
+        self.interval = interval_ms / 1000
+        self._pending: Dict[int, Dict[str, int]] = defaultdict(lambda: {"up": 0, "down": 0})
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.votes_buffered = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_ms = 0.0
+
+    def _merge(self, idea_id: int, deltas: Dict[str, int]) -> None:
+        pending = self._pending[idea_id]
+        for vote_type, delta in deltas.items():
+            pending[vote_type] += delta
+
+    def add(self, idea_id: int, deltas: Dict[str, int]) -> None:
+        """Queue counter deltas for an idea."""
+        self._merge(idea_id, deltas)
+        self.votes_buffered += 1
+
+    def pending(self, idea_id: int) -> Dict[str, int]:
+        """Return deltas for an idea that are not yet in the database."""
+        return dict(self._pending.get(idea_id, {"up": 0, "down": 0}))
+
+    async def flush(self) -> int:
+        """Write all pending deltas in one transaction and return the idea count."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(lambda: {"up": 0, "down": 0})
+            params = [
+                {"b_idea_id": idea_id, "b_up": deltas["up"], "b_down": deltas["down"]}
+                for idea_id, deltas in batch.items()
+                if deltas["up"] or deltas["down"]
+            ]
+            if not params:
+                return 0
+            started = time.perf_counter()
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(_flush_statement, params)
+            except Exception:
+                # Put the batch back so the next flush retries it
+                for idea_id, deltas in batch.items():
+                    self._merge(idea_id, deltas)
+                raise
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(params)
+            return len(params)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Vote buffer flush failed; retrying next interval")
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """Return buffer counters for monitoring."""
+        return {
+            "interval_ms": self.interval * 1000,
+            "pending_ideas": len(self._pending),
+            "votes_buffered": self.votes_buffered,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+vote_buffer = VoteBuffer(VOTE_BUFFER_INTERVAL_MS) if VOTE_BUFFER_ENABLED else None
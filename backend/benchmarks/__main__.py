@@ -0,0 +1,97 @@
+"""Command line entry point: python -m benchmarks {seed,run,micro,compare}.
+
+Run from backend/ so the app package and main module are importable.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from .scenarios import DEFAULT_SCENARIOS, SCENARIOS
+from .seed import SCALES
+
+def _use_database(url: str) -> None:
+    # The app reads DATABASE_URL at import time, so set it before importing anything from it
+    if url:
+        os.environ["DATABASE_URL"] = url
+
+def cmd_seed(args) -> None:
+    _use_database(args.database)
+    from .seed import seed
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    print(f"Seeding {os.getenv('DATABASE_URL', 'sqlite:///./community_app.db')}: {counts}")
+    seed(counts, args.participants, args.seed, args.reset)
+
+def cmd_run(args) -> None:
+    _use_database(args.database)
+    from .runner import HEADER, run, save
+    scenarios = args.scenarios.split(",") if args.scenarios else DEFAULT_SCENARIOS
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+    print(HEADER)
+    document = asyncio.run(run(
+        scenarios, args.requests, args.concurrency, args.virtual_users, args.warmup, args.seed, args.base_url,
+        args.writers
+    ))
+    if args.micro:
+        from .micro import run_micro
+        document["micro"] = run_micro()
+    print(f"Results written to {save(document, args.output)}")
+
+def cmd_micro(args) -> None:
+    from .micro import run_micro
+    run_micro()
+
+def cmd_compare(args) -> None:
+    from .runner import compare
+    with open(args.base) as base, open(args.head) as head:
+        ok = compare(json.load(base), json.load(head), args.threshold)
+    sys.exit(0 if ok else 1)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Seed data and benchmark the API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    seed = commands.add_parser("seed", help="Fill a database with generated data")
+    seed.add_argument("--database", help="Database URL (default: DATABASE_URL)")
+    seed.add_argument("--scale", choices=SCALES, default="small")
+    for name in SCALES["small"]:
+        seed.add_argument(f"--{name}", type=int, help=f"Number of {name} (overrides --scale)")
+    seed.add_argument("--participants", type=int, default=4, help="Participants per expense")
+    seed.add_argument("--seed", type=int, default=42, help="Random seed")
+    seed.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    seed.set_defaults(func=cmd_seed)
+    
+    run = commands.add_parser("run", help="Run scenarios and store results as JSON")
+    run.add_argument("--database", help="Database URL for in-process runs (default: DATABASE_URL)")
+    run.add_argument("--base-url", help="Benchmark a running server instead of the app in-process")
+    run.add_argument("--scenarios", help=f"Comma-separated scenarios (default: {','.join(DEFAULT_SCENARIOS)})")
+    run.add_argument("--requests", type=int, default=200, help="Operations per scenario")
+    run.add_argument("--concurrency", type=int, default=10)
+    run.add_argument("--virtual-users", type=int, default=20, help="Seeded users to log in as")
+    run.add_argument("--writers", type=int, default=0, help="Background workers writing throughout the run")
+    run.add_argument("--warmup", type=int, default=5, help="Untimed operations per scenario")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--micro", action="store_true", help="Also run the micro-benchmarks")
+    run.add_argument("--output", help="Results file (default: benchmarks/results/<time>-<commit>.json)")
+    run.set_defaults(func=cmd_run)
+    
+    micro = commands.add_parser("micro", help="Run the database-free micro-benchmarks")
+    micro.set_defaults(func=cmd_micro)
+    
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 increase in percent")
+    compare.set_defaults(func=cmd_compare)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
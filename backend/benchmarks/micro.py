@@ -0,0 +1,81 @@
+"""Micro-benchmarks for pure-Python hot spots that do not need the database."""
+import asyncio
+import random
+import time
+from typing import Callable, Dict
+
+from .runner import percentile
+
+def _time(func: Callable[[], object], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "p50_ms": percentile(timings, 0.50),
+        "p95_ms": percentile(timings, 0.95),
+        "max_ms": timings[-1],
+    }
+
+def _random_balances(rng: random.Random, users: int) -> Dict[int, int]:
+    balances = {user_id: rng.randint(-50000, 50000) for user_id in range(1, users)}
+    balances[users] = -sum(balances.values())
+    return balances
+
+def settle_plan_greedy() -> dict:
+    from app.settlement import plan_settlement
+    balances = _random_balances(random.Random(1), 10000)
+    result = _time(lambda: plan_settlement(balances), 20)
+    result["transfers"] = len(plan_settlement(balances))
+    return result
+
+def settle_plan_exact() -> dict:
+    from app.settlement import EXACT_SOLVER_MAX_USERS, plan_settlement
+    balances = _random_balances(random.Random(1), EXACT_SOLVER_MAX_USERS)
+    result = _time(lambda: plan_settlement(balances), 5)
+    result["users"] = EXACT_SOLVER_MAX_USERS
+    return result
+
+def allocate_1000() -> dict:
+    from app.money import allocate
+    weights = [random.Random(2).randint(1, 100) for _ in range(1000)]
+    return _time(lambda: allocate(123456789, weights), 200)
+
+def broadcaster_fanout() -> dict:
+    """Publish to 5000 idle subscribers, draining their queues between messages."""
+    from app.broadcast import Broadcaster
+    
+    async def measure():
+        broadcaster = Broadcaster(queue_size=10)
+        contexts = [broadcaster.subscribe() for _ in range(5000)]
+        queues = [await context.__aenter__() for context in contexts]
+        alert = {"id": 1, "title": "Bench alert", "description": "x" * 200}
+        
+        def publish():
+            broadcaster.publish("alert_created", alert)
+            for queue in queues:
+                queue.get_nowait()
+        result = _time(publish, 50)
+        for context in contexts:
+            await context.__aexit__(None, None, None)
+        result["subscribers"] = len(queues)
+        return result
+    
+    return asyncio.run(measure())
+
+MICRO_BENCHMARKS = {
+    "settle_plan_greedy_10k_users": settle_plan_greedy,
+    "settle_plan_exact": settle_plan_exact,
+    "allocate_1000_shares": allocate_1000,
+    "broadcast_5000_subscribers": broadcaster_fanout,
+}
+
+def run_micro() -> dict:
+    results = {}
+    for name, func in MICRO_BENCHMARKS.items():
+        results[name] = func()
+        print(f"{name:<34} p50 {results[name]['p50_ms']:>9.3f} ms  p95 {results[name]['p95_ms']:>9.3f} ms", flush=True)
+    return results
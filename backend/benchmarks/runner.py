@@ -0,0 +1,221 @@
+"""Drive scenarios against the app and report latency percentiles.
+
+In-process runs import main and send requests through httpx's ASGI
+transport, so they measure the application without network or server
+overhead. HTTP runs go to a live server at --base-url.
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from .scenarios import SCENARIOS, SETUPS, WRITE_SCENARIOS, Context
+from .seed import BENCH_PASSWORD, USERNAME
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies_ms: List[float], statuses: Counter, elapsed: float) -> dict:
+    latencies_ms = sorted(latencies_ms)
+    count = len(latencies_ms)
+    return {
+        "requests": count,
+        "errors": sum(n for status, n in statuses.items() if status == "error" or int(status) >= 500),
+        "statuses": dict(statuses),
+        "throughput_rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies_ms) / count if count else 0.0,
+        "p50_ms": percentile(latencies_ms, 0.50),
+        "p95_ms": percentile(latencies_ms, 0.95),
+        "p99_ms": percentile(latencies_ms, 0.99),
+        "max_ms": latencies_ms[-1] if latencies_ms else 0.0,
+    }
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, name: str, requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    """Run requests operations of one scenario with concurrency workers."""
+    func = SCENARIOS[name]
+    rng = random.Random(seed)
+    if name in SETUPS:
+        await SETUPS[name](client, ctx)
+    for _ in range(warmup):
+        await func(client, ctx, rng)
+    
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = requests
+    
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await _timed(func, client, ctx, rng, latencies, statuses)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+async def _timed(func, client, ctx, rng, latencies: List[float], statuses: Counter) -> None:
+    started = time.perf_counter()
+    try:
+        response = await func(client, ctx, rng)
+        statuses[str(response.status_code)] += 1
+    except httpx.HTTPError:
+        statuses["error"] += 1
+    latencies.append((time.perf_counter() - started) * 1000)
+
+async def run_writers(client: httpx.AsyncClient, ctx: Context, writers: int, seed: int, stop: asyncio.Event) -> dict:
+    """Issue WRITE_SCENARIOS from writers workers until stop is set."""
+    rng = random.Random(seed + 1)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    
+    async def worker():
+        while not stop.is_set():
+            await _timed(SCENARIOS[rng.choice(WRITE_SCENARIOS)], client, ctx, rng, latencies, statuses)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(writers)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+async def _login(client: httpx.AsyncClient, user_number: int) -> Dict[str, str]:
+    response = await client.post(
+        "/api/auth/login-json", json={"username": USERNAME.format(user_number), "password": BENCH_PASSWORD}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def _newest_id(client: httpx.AsyncClient, headers: Dict[str, str], path: str, **params) -> int:
+    # Seeded ids are contiguous and ascend with created_at, so the newest row's id bounds the range
+    response = await client.get(path, params={"limit": 1, **params}, headers=headers)
+    response.raise_for_status()
+    rows = response.json()
+    return max((row["id"] for row in rows), default=0)
+
+async def build_context(client: httpx.AsyncClient, virtual_users: int) -> Context:
+    """Log in the virtual users and discover the seeded id ranges through the API."""
+    headers = []
+    # Logins hash passwords in a bounded pool, so go a few at a time
+    for start in range(1, virtual_users + 1, 4):
+        batch = range(start, min(start + 4, virtual_users + 1))
+        headers.extend(await asyncio.gather(*(_login(client, number) for number in batch)))
+    admin = headers[0]
+    max_ids = {
+        "users": max(await _newest_id(client, admin, "/api/users/"), virtual_users),
+        "ideas": await _newest_id(client, admin, "/api/ideas/"),
+        "alerts": await _newest_id(client, admin, "/api/alerts/"),
+        "items": await _newest_id(client, admin, "/api/marketplace/", available_only="false"),
+    }
+    ctx = Context(headers=headers, max_ids=max_ids)
+    for index, user_headers in enumerate(headers):
+        response = await client.get(
+            "/api/expenses/", params={"my_expenses_only": "true", "limit": 20}, headers=user_headers
+        )
+        ctx.expenses.extend((index, expense["id"]) for expense in response.json())
+    return ctx
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@asynccontextmanager
+async def _client(base_url: Optional[str]):
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            yield client
+        return
+    # Imported only now, so DATABASE_URL from --database applies to the app
+    import main
+    async with main.app.router.lifespan_context(main.app):
+        # Report unhandled errors as 500s, as a server would, instead of aborting the run
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            yield client
+
+async def run(scenarios: List[str], requests: int, concurrency: int, virtual_users: int, warmup: int,
+              seed: int, base_url: Optional[str] = None, writers: int = 0) -> dict:
+    """Run the scenarios in order and return the results document.
+
+    With writers, that many workers keep writing for the whole run, so the
+    read scenarios are measured under write contention; their own latencies
+    are reported as background_writes.
+    """
+    async with _client(base_url) as client:
+        ctx = await build_context(client, virtual_users)
+        results = {}
+        stop = asyncio.Event()
+        background = asyncio.create_task(run_writers(client, ctx, writers, seed, stop)) if writers else None
+        for name in scenarios:
+            results[name] = await run_scenario(client, ctx, name, requests, concurrency, warmup, seed)
+            print(format_row(name, results[name]), flush=True)
+        if background is not None:
+            stop.set()
+            results["background_writes"] = await background
+            print(format_row("background_writes", results["background_writes"]), flush=True)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "target": base_url or "in-process",
+            "database": None if base_url else os.getenv("DATABASE_URL", "sqlite:///./community_app.db"),
+            "python": platform.python_version(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "writers": writers,
+            "virtual_users": virtual_users,
+            "seed": seed,
+            "max_ids": ctx.max_ids,
+        },
+        "scenarios": results,
+    }
+
+HEADER = f"{'scenario':<34} {'reqs':>6} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+
+def format_row(name: str, result: dict) -> str:
+    return (
+        f"{name:<34} {result['requests']:>6} {result['errors']:>5} {result['throughput_rps']:>9.1f} "
+        f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+    )
+
+def save(document: dict, output: Optional[str]) -> str:
+    """Write results as JSON, by default to benchmarks/results/<timestamp>-<commit>.json."""
+    if output is None:
+        directory = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(directory, f"{stamp}-{document['meta']['commit'] or 'nocommit'}.json")
+    with open(output, "w") as handle:
+        json.dump(document, handle, indent=2)
+    return output
+
+def compare(base: dict, head: dict, threshold: float) -> bool:
+    """Print per-scenario changes and return False if any p95 regressed past threshold percent."""
+    print(f"{'scenario':<34} {'p50 ms':>17} {'p95 ms':>17} {'rps':>17}")
+    ok = True
+    for name, new in head["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "throughput_rps"):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{old[key]:>7.1f}>{new[key]:<7.1f}{change:+.0f}%")
+        regressed = old["p95_ms"] and (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 > threshold
+        ok = ok and not regressed
+        print(f"{name:<34} {'  '.join(cells)}{'  REGRESSION' if regressed else ''}")
+    return ok
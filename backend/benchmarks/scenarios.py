@@ -0,0 +1,249 @@
+"""Benchmark scenarios.
+
+A scenario is a coroutine that performs one operation against the API through
+an httpx client and returns the last response; the runner times it. Scenarios
+pick their targets at random from the seeded id ranges in the Context. A
+scenario may also register an untimed setup step that runs once before it.
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .seed import CENTER, WORDS, random_text
+
+@dataclass
+class Context:
+    """Logged-in virtual users and the id ranges scenarios draw from."""
+
+    headers: List[Dict[str, str]]
+    max_ids: Dict[str, int]
+    # (virtual user index, expense id) pairs the user may read
+    expenses: List[Tuple[int, int]] = field(default_factory=list)
+    # Last ETag seen per (scenario, user), for the conditional scenarios
+    etags: Dict[Tuple[str, int], str] = field(default_factory=dict)
+    # Cursors resolved by setup steps, per scenario
+    cursors: Dict[str, Optional[str]] = field(default_factory=dict)
+    
+    def user(self, rng: random.Random) -> Tuple[int, Dict[str, str]]:
+        index = rng.randrange(len(self.headers))
+        return index, self.headers[index]
+    
+    def id(self, rng: random.Random, kind: str) -> int:
+        return rng.randint(1, max(self.max_ids.get(kind, 1), 1))
+
+Scenario = Callable[[httpx.AsyncClient, Context, random.Random], Awaitable[httpx.Response]]
+Setup = Callable[[httpx.AsyncClient, Context], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {}
+SETUPS: Dict[str, Setup] = {}
+
+def scenario(name: str):
+    def register(func: Scenario) -> Scenario:
+        SCENARIOS[name] = func
+        return func
+    return register
+
+def setup(name: str):
+    def register(func: Setup) -> Setup:
+        SETUPS[name] = func
+        return func
+    return register
+
+# Ideas
+
+@scenario("ideas_list")
+async def ideas_list(client, ctx, rng):
+    return await client.get("/api/ideas/", params={"limit": 20}, headers=ctx.user(rng)[1])
+
+@scenario("ideas_offset_page_500")
+async def ideas_offset_page_500(client, ctx, rng):
+    return await client.get("/api/ideas/", params={"skip": 500 * 20, "limit": 20}, headers=ctx.user(rng)[1])
+
+@setup("ideas_cursor_page_500")
+async def resolve_ideas_page_500(client, ctx):
+    # The cursor that starts the same page ideas_offset_page_500 reads: the
+    # position of the row just before it
+    response = await client.get("/api/ideas/", params={"skip": 500 * 20 - 1, "limit": 1}, headers=ctx.headers[0])
+    response.raise_for_status()
+    ctx.cursors["ideas_cursor_page_500"] = response.headers.get("x-next-cursor")
+
+@scenario("ideas_cursor_page_500")
+async def ideas_cursor_page_500(client, ctx, rng):
+    params = {"limit": 20}
+    cursor = ctx.cursors.get("ideas_cursor_page_500")
+    if cursor:
+        params["cursor"] = cursor
+    return await client.get("/api/ideas/", params=params, headers=ctx.user(rng)[1])
+
+@scenario("idea_detail")
+async def idea_detail(client, ctx, rng):
+    return await client.get(f"/api/ideas/{ctx.id(rng, 'ideas')}", headers=ctx.user(rng)[1])
+
+@scenario("idea_vote")
+async def idea_vote(client, ctx, rng):
+    return await client.post(
+        f"/api/ideas/{ctx.id(rng, 'ideas')}/vote",
+        params={"vote_type": rng.choice(["up", "down"])},
+        headers=ctx.user(rng)[1]
+    )
+
+@scenario("idea_create")
+async def idea_create(client, ctx, rng):
+    return await client.post(
+        "/api/ideas/",
+        json={"title": random_text(rng, 4), "description": random_text(rng, 30), "category": "community"},
+        headers=ctx.user(rng)[1]
+    )
+
+@scenario("ideas_list_conditional")
+async def ideas_list_conditional(client, ctx, rng):
+    return await _conditional_get(client, ctx, rng, "ideas_list_conditional", "/api/ideas/?limit=20")
+
+# Alerts
+
+@scenario("alerts_active")
+async def alerts_active(client, ctx, rng):
+    return await client.get("/api/alerts/active", params={"limit": 20}, headers=ctx.user(rng)[1])
+
+@scenario("alerts_near")
+async def alerts_near(client, ctx, rng):
+    latitude = CENTER[0] + rng.uniform(-0.1, 0.1)
+    longitude = CENTER[1] + rng.uniform(-0.1, 0.1)
+    return await client.get(
+        "/api/alerts/",
+        params={"near": f"{latitude},{longitude}", "radius_m": 2000, "limit": 20},
+        headers=ctx.user(rng)[1]
+    )
+
+@scenario("alert_detail")
+async def alert_detail(client, ctx, rng):
+    return await client.get(f"/api/alerts/{ctx.id(rng, 'alerts')}", headers=ctx.user(rng)[1])
+
+# Marketplace
+
+@scenario("items_list")
+async def items_list(client, ctx, rng):
+    return await client.get("/api/marketplace/", params={"limit": 20}, headers=ctx.user(rng)[1])
+
+@scenario("items_free_period")
+async def items_free_period(client, ctx, rng):
+    starts_at = datetime.utcnow() + timedelta(hours=rng.randint(1, 24 * 14))
+    return await client.get(
+        "/api/marketplace/",
+        params={
+            "free_from": starts_at.isoformat(),
+            "free_to": (starts_at + timedelta(hours=rng.randint(2, 48))).isoformat(),
+            "limit": 20,
+        },
+        headers=ctx.user(rng)[1]
+    )
+
+@scenario("item_detail")
+async def item_detail(client, ctx, rng):
+    return await client.get(f"/api/marketplace/{ctx.id(rng, 'items')}", headers=ctx.user(rng)[1])
+
+@scenario("item_reservations")
+async def item_reservations(client, ctx, rng):
+    return await client.get(f"/api/marketplace/{ctx.id(rng, 'items')}/reservations", headers=ctx.user(rng)[1])
+
+@scenario("item_borrow_contended")
+async def item_borrow_contended(client, ctx, rng):
+    # Every worker fights over the same few items; expect mostly 400s and 409s
+    return await client.post(
+        f"/api/marketplace/{rng.randint(1, 5)}/borrow", params={"days": 1}, headers=ctx.user(rng)[1]
+    )
+
+# Expenses
+
+@scenario("expenses_mine")
+async def expenses_mine(client, ctx, rng):
+    return await client.get(
+        "/api/expenses/", params={"my_expenses_only": "true", "limit": 20}, headers=ctx.user(rng)[1]
+    )
+
+@scenario("expense_detail")
+async def expense_detail(client, ctx, rng):
+    if not ctx.expenses:
+        return await expenses_mine(client, ctx, rng)
+    index, expense_id = rng.choice(ctx.expenses)
+    return await client.get(f"/api/expenses/{expense_id}", headers=ctx.headers[index])
+
+@scenario("expense_balances")
+async def expense_balances(client, ctx, rng):
+    return await client.get("/api/expenses/balances", headers=ctx.user(rng)[1])
+
+@scenario("expense_settle_plan")
+async def expense_settle_plan(client, ctx, rng):
+    return await client.get("/api/expenses/settle-plan", headers=ctx.user(rng)[1])
+
+@scenario("expense_create")
+async def expense_create(client, ctx, rng):
+    participants = rng.sample(range(1, ctx.max_ids["users"] + 1), min(5, ctx.max_ids["users"]))
+    return await client.post(
+        "/api/expenses/",
+        json={"title": "Bench expense", "total_amount": 1234.56, "category": "events", "participant_ids": participants},
+        headers=ctx.user(rng)[1]
+    )
+
+@scenario("expense_create_1000_participants")
+async def expense_create_1000_participants(client, ctx, rng):
+    participants = list(range(1, min(1000, ctx.max_ids["users"]) + 1))
+    return await client.post(
+        "/api/expenses/",
+        json={"title": "Bench levy", "total_amount": 100000, "category": "maintenance", "participant_ids": participants},
+        headers=ctx.user(rng)[1]
+    )
+
+# Search and dashboard
+
+@scenario("search")
+async def search(client, ctx, rng):
+    query = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+    return await client.get("/api/search/", params={"q": query}, headers=ctx.user(rng)[1])
+
+@scenario("dashboard")
+async def dashboard(client, ctx, rng):
+    return await client.get("/api/dashboard/", headers=ctx.user(rng)[1])
+
+@scenario("dashboard_as_four_calls")
+async def dashboard_as_four_calls(client, ctx, rng):
+    # What the dashboard page cost before the aggregated endpoint
+    _, headers = ctx.user(rng)
+    responses = await asyncio.gather(
+        client.get("/api/ideas/", params={"limit": 5}, headers=headers),
+        client.get("/api/alerts/active", params={"limit": 5}, headers=headers),
+        client.get("/api/marketplace/", params={"limit": 5}, headers=headers),
+        client.get("/api/expenses/", params={"my_expenses_only": "true", "limit": 5}, headers=headers),
+    )
+    return max(responses, key=lambda response: response.status_code)
+
+@scenario("dashboard_conditional")
+async def dashboard_conditional(client, ctx, rng):
+    return await _conditional_get(client, ctx, rng, "dashboard_conditional", "/api/dashboard/")
+
+async def _conditional_get(client, ctx, rng, name: str, url: str) -> httpx.Response:
+    """GET with the ETag this user saw last time, as a browser revalidating would."""
+    index, headers = ctx.user(rng)
+    etag = ctx.etags.get((name, index))
+    if etag:
+        headers = {**headers, "If-None-Match": etag}
+    response = await client.get(url, headers=headers)
+    if "etag" in response.headers:
+        ctx.etags[(name, index)] = response.headers["etag"]
+    return response
+
+# Writes issued by the background writers of run --writers
+WRITE_SCENARIOS = ["idea_create", "expense_create"]
+
+# Scenarios run by default; the rest are heavy or write-heavy and run on request
+DEFAULT_SCENARIOS = [
+    "ideas_list", "ideas_offset_page_500", "ideas_cursor_page_500", "idea_detail", "ideas_list_conditional",
+    "alerts_active", "alerts_near", "alert_detail",
+    "items_list", "items_free_period", "item_detail", "item_reservations",
+    "expenses_mine", "expense_detail", "expense_balances", "expense_settle_plan",
+    "search", "dashboard", "dashboard_as_four_calls", "dashboard_conditional",
+]
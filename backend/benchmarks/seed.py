@@ -0,0 +1,223 @@
+"""Bulk data seeder for benchmarks.
+
+Rows are generated deterministically from --seed and written with Core
+executemany inserts in large batches, skipping the ORM. The search index is
+dropped while seeding and rebuilt with one INSERT ... SELECT afterwards, and
+the expense ledger is rebuilt from the seeded splits, so the database ends up
+exactly as the API would have left it.
+"""
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+# Row counts per scale; any count can be overridden on the command line
+SCALES = {
+    "small": dict(users=1000, ideas=10000, votes=20000, alerts=10000, items=5000, reservations=10000, expenses=5000),
+    "medium": dict(users=10000, ideas=100000, votes=200000, alerts=100000, items=50000, reservations=100000, expenses=50000),
+    "large": dict(users=100000, ideas=1000000, votes=2000000, alerts=1000000, items=100000, reservations=1000000, expenses=200000),
+}
+
+# Every seeded user logs in with this password
+BENCH_PASSWORD = "benchmark"
+USERNAME = "bench{}"
+
+BATCH_SIZE = 20000
+
+# Alerts are scattered within ALERT_SPREAD_DEG of this point
+CENTER = (13.0707, 77.7982)
+ALERT_SPREAD_DEG = 0.2
+
+WORDS = (
+    "garden park road light water drain school library bus stop market clinic "
+    "tree bench footpath cycle lane parking noise waste recycling compost solar "
+    "festival cleanup volunteer playground lake temple bridge signal pothole "
+    "drill ladder projector tent speaker camera guitar bicycle mower tools books "
+    "theft robbery suspicious vehicle fire flood power outage emergency stray dog "
+    "maintenance security electricity cleaning event repair paint gate pump lift"
+).split()
+IDEA_CATEGORIES = ["environment", "education", "health", "infrastructure", "safety", "community"]
+IDEA_STATUSES = ["pending", "approved", "rejected", "implemented"]
+ALERT_TYPES = ["theft", "robbery", "emergency", "suspicious_activity"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+ITEM_CATEGORIES = ["electronics", "books", "tools", "furniture", "sports", "garden"]
+ITEM_TYPES = ["lend", "borrow", "both"]
+CONDITIONS = ["excellent", "good", "fair", "poor"]
+EXPENSE_CATEGORIES = ["maintenance", "events", "utilities", "security", "cleaning"]
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def _created_at(rng: random.Random, now: datetime, index: int, count: int, days: int = 365) -> datetime:
+    # Spread rows over the last `days`, oldest first, so ids ascend with created_at
+    # as they do in a live database
+    step = days * 86400 / max(count, 1)
+    return now - timedelta(seconds=(count - index) * step + rng.random() * step)
+
+def _batches(rows: Iterator[dict], size: int = BATCH_SIZE) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _users(rng, now, count, hashed_password):
+    for i in range(1, count + 1):
+        yield dict(
+            id=i, username=USERNAME.format(i), email=f"bench{i}@bench.example", full_name=f"Bench User {i}",
+            hashed_password=hashed_password, is_active=True, created_at=_created_at(rng, now, i, count, 730),
+        )
+
+def _ideas(rng, now, count, users):
+    for i in range(1, count + 1):
+        yield dict(
+            id=i, title=random_text(rng, 4), description=random_text(rng, 30), category=rng.choice(IDEA_CATEGORIES),
+            status=rng.choice(IDEA_STATUSES), votes_up=0, votes_down=0, author_id=rng.randint(1, users),
+            created_at=_created_at(rng, now, i, count), updated_at=now,
+        )
+
+def _votes(rng, now, count, users, ideas):
+    if not ideas or not users:
+        return
+    seen = set()
+    attempts = 0
+    while len(seen) < count and attempts < count * 3:
+        attempts += 1
+        key = (rng.randint(1, ideas), rng.randint(1, users))
+        if key in seen:
+            continue
+        seen.add(key)
+        vote_type = "up" if rng.random() < 0.75 else "down"
+        yield dict(idea_id=key[0], user_id=key[1], vote_type=vote_type, created_at=now, updated_at=now)
+
+def _alerts(rng, now, count, users):
+    from app.geo import cell_for
+    for i in range(1, count + 1):
+        latitude = CENTER[0] + rng.uniform(-ALERT_SPREAD_DEG, ALERT_SPREAD_DEG)
+        longitude = CENTER[1] + rng.uniform(-ALERT_SPREAD_DEG, ALERT_SPREAD_DEG)
+        status = "active" if rng.random() < 0.3 else rng.choice(["resolved", "false_alarm", "expired"])
+        created_at = _created_at(rng, now, i, count)
+        yield dict(
+            id=i, title=random_text(rng, 4), description=random_text(rng, 20), alert_type=rng.choice(ALERT_TYPES),
+            location=random_text(rng, 2), latitude=latitude, longitude=longitude, geo_cell=cell_for(latitude, longitude),
+            severity=rng.choice(SEVERITIES), status=status, author_id=rng.randint(1, users), created_at=created_at,
+            resolved_at=None if status == "active" else created_at + timedelta(hours=rng.randint(1, 72)),
+        )
+
+def _items(rng, now, count, users):
+    for i in range(1, count + 1):
+        owner_id = rng.randint(1, users)
+        borrowed = rng.random() < 0.2
+        borrowed_at = now - timedelta(days=rng.randint(0, 10)) if borrowed else None
+        yield dict(
+            id=i, title=random_text(rng, 3), description=random_text(rng, 20), category=rng.choice(ITEM_CATEGORIES),
+            item_type=rng.choice(ITEM_TYPES), condition=rng.choice(CONDITIONS), availability=not borrowed,
+            duration_max=rng.choice([3, 7, 14, 30]), price_per_day=rng.choice([0.0, 0.0, 50.0, 100.0]),
+            owner_id=owner_id, seller_id=owner_id,
+            current_borrower_id=(owner_id % users) + 1 if borrowed else None,
+            borrowed_at=borrowed_at, return_by=borrowed_at + timedelta(days=7) if borrowed else None,
+            created_at=_created_at(rng, now, i, count), updated_at=now,
+        )
+
+def _reservations(rng, now, count, users, items):
+    # Back-to-back bookings per item, so none overlap
+    per_item = max(1, math.ceil(count / max(items, 1)))
+    made = 0
+    for item_id in range(1, items + 1):
+        starts_at = now + timedelta(hours=rng.randint(1, 48))
+        for _ in range(per_item):
+            if made == count:
+                return
+            ends_at = starts_at + timedelta(hours=rng.randint(2, 72))
+            yield dict(item_id=item_id, user_id=rng.randint(1, users), starts_at=starts_at, ends_at=ends_at, created_at=now)
+            starts_at = ends_at + timedelta(hours=rng.randint(0, 48))
+            made += 1
+
+def _expenses(rng, now, count, users, participants_per_expense, participant_rows, split_rows):
+    from app.money import allocate
+    for i in range(1, count + 1):
+        created_by_id = rng.randint(1, users)
+        participants = rng.sample(range(1, users + 1), min(participants_per_expense, users))
+        total_cents = rng.randint(100, 500000)
+        settled = rng.random() < 0.3
+        created_at = _created_at(rng, now, i, count)
+        for user_id, cents in zip(participants, allocate(total_cents, [1] * len(participants))):
+            participant_rows.append(dict(expense_id=i, user_id=user_id))
+            paid = cents if settled or user_id == created_by_id else rng.choice([0, 0, cents // 2])
+            split_rows.append(dict(
+                expense_id=i, user_id=user_id, amount_owed_cents=cents, amount_paid_cents=paid,
+                is_settled=paid == cents, settled_at=created_at if paid == cents else None,
+            ))
+        yield dict(
+            id=i, title=random_text(rng, 3), description=random_text(rng, 10), total_amount_cents=total_cents,
+            category=rng.choice(EXPENSE_CATEGORIES), split_type="equal", status="settled" if settled else "pending",
+            created_by_id=created_by_id, created_at=created_at,
+            due_date=created_at + timedelta(days=30), settled_at=created_at if settled else None,
+        )
+
+def _insert(conn, table, rows: Iterator[dict]) -> int:
+    total = 0
+    for batch in _batches(rows):
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+def seed(counts: Dict[str, int], participants_per_expense: int = 4, random_seed: int = 42, reset: bool = False) -> Dict[str, int]:
+    """Fill the database at DATABASE_URL and return rows written per table."""
+    from sqlalchemy import func, select
+    from app.auth import get_password_hash
+    from app.database import engine
+    from app.ledger import rebuild_statements
+    from app.vote_buffer import rebuild_counts_statement
+    from app.models import (
+        Base, User, Idea, IdeaVote, Alert, MarketplaceItem, Reservation, Expense, ExpenseSplit,
+        expense_participants,
+    )
+    from app.search import drop_search_index, install_search_index
+    
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    users = counts["users"]
+    written = {}
+    
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            raise SystemExit("The database already has users; pass --reset to wipe it first")
+        if conn.dialect.name == "sqlite":
+            # Durability does not matter for a throwaway benchmark database
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        drop_search_index(conn)
+        
+        def timed(name, table, rows):
+            started = time.perf_counter()
+            written[name] = _insert(conn, table, rows)
+            print(f"  {name}: {written[name]} rows in {time.perf_counter() - started:.1f}s")
+        
+        timed("users", User.__table__, _users(rng, now, users, get_password_hash(BENCH_PASSWORD)))
+        timed("ideas", Idea.__table__, _ideas(rng, now, counts["ideas"], users))
+        timed("idea_votes", IdeaVote.__table__, _votes(rng, now, counts["votes"], users, counts["ideas"]))
+        conn.execute(rebuild_counts_statement())
+        timed("alerts", Alert.__table__, _alerts(rng, now, counts["alerts"], users))
+        timed("marketplace_items", MarketplaceItem.__table__, _items(rng, now, counts["items"], users))
+        timed("reservations", Reservation.__table__, _reservations(rng, now, counts["reservations"], users, counts["items"]))
+        participant_rows: List[dict] = []
+        split_rows: List[dict] = []
+        timed("expenses", Expense.__table__, _expenses(
+            rng, now, counts["expenses"], users, participants_per_expense, participant_rows, split_rows
+        ))
+        timed("expense_participants", expense_participants, iter(participant_rows))
+        timed("expense_splits", ExpenseSplit.__table__, iter(split_rows))
+        
+        started = time.perf_counter()
+        for statement in rebuild_statements():
+            conn.execute(statement)
+        install_search_index(conn)
+        print(f"  ledger and search index rebuilt in {time.perf_counter() - started:.1f}s")
+    return written
@@ -1,21 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import math
 import os
 
-from app.routers import auth, ideas, alerts, marketplace, expenses, users
-from app.database import engine
+from app.routers import auth, ideas, alerts, marketplace, expenses, users, search, dashboard
+from app.database import engine, pool_stats, replicas
 from app.models import Base
+from app.vote_buffer import vote_buffer
+from app.sweeps import scheduler
+from app.auth import user_cache
+from app.broadcast import alert_broadcaster
+from app import metrics, profiler, slow_queries
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if vote_buffer is not None:
+        vote_buffer.start()
+    if scheduler is not None:
+        scheduler.start()
+    if replicas is not None:
+        replicas.start()
+    yield
+    if replicas is not None:
+        await replicas.stop()
+    if scheduler is not None:
+        await scheduler.stop()
+    # Flush buffered writes before the process exits
+    if vote_buffer is not None:
+        await vote_buffer.stop()
+
 app = FastAPI(
     title="Community App API",
     description="A community platform for ideas, safety, marketplace, and expense sharing",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Validation errors echo the rejected input, which may be NaN or infinity and
+# so not encodable as JSON; send those back as strings instead
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    encoders = {float: lambda value: value if math.isfinite(value) else str(value)}
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors(), custom_encoder=encoders)})
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +58,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Opt-in sampling profiler; writes folded stacks to PROFILE_DIR
+if profiler.PROFILER_ENABLED:
+    app.add_middleware(profiler.ProfilerMiddleware)
+
+# Per-route latency, size and SQL metrics, exported on /metrics
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_collector("user_cache", user_cache.stats, ("hits", "misses", "evictions", "invalidations"))
+    metrics.register_collector("alert_broadcaster", alert_broadcaster.stats, ("published", "dropped_subscribers"))
+    metrics.register_collector("db", slow_queries.stats, ("slow_queries", "explain_failures"))
+    metrics.register_collector("db_pool", pool_stats)
+    if replicas is not None:
+        metrics.register_collector("db_replica", replicas.stats, ("reads", "failures"))
+    if vote_buffer is not None:
+        metrics.register_collector("vote_buffer", vote_buffer.stats, ("votes_buffered", "flushes", "rows_flushed"))
+    if scheduler is not None:
+        metrics.register_collector(
+            "scheduler_job", scheduler.stats, ("runs", "failures", "skipped_not_leader", "rows_processed")
+        )
+
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -36,11 +92,18 @@ app.include_router(ideas.router, prefix="/api/ideas", tags=["ideas"])
 app.include_router(alerts.router, prefix="/api/alerts", tags=["alerts"])
 app.include_router(marketplace.router, prefix="/api/marketplace", tags=["marketplace"])
 app.include_router(expenses.router, prefix="/api/expenses", tags=["expenses"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 
 @app.get("/")
 async def root():
     return {"message": "Community App API is running!"}
 
+if metrics.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def read_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import asyncio
+import itertools
+import os
+import tempfile
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+# The app reads its settings at import time, so point it at a scratch database
+# before anything imports it
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='community-tests-')}/test.db"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["VOTE_BUFFER_ENABLED"] = "false"
+
+from main import app
+from app.database import async_engine, async_read_engine, sync_engines
+
+PASSWORD = "password123"
+
+_usernames = itertools.count(1)
+
+async def _run_with_client(body):
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            try:
+                return await body(client)
+            finally:
+                # Pooled connections belong to this test's event loop
+                await async_engine.dispose()
+                await async_read_engine.dispose()
+
+@pytest.fixture(scope="session")
+def run():
+    """Run an async test body against the app; it receives an httpx client."""
+    return lambda body: asyncio.run(_run_with_client(body))
+
+@pytest.fixture(scope="session")
+def login():
+    """Register a new user and return (user id, auth headers)."""
+    async def login(client: httpx.AsyncClient):
+        username = f"user{next(_usernames)}"
+        await client.post("/api/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "full_name": username, "password": PASSWORD
+        })
+        response = await client.post("/api/auth/login-json", json={"username": username, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.get("/api/users/me", headers=headers)
+        return response.json()["id"], headers
+    return login
+
+class StatementCounter:
+    """Counts SQL statements sent to any engine while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+@pytest.fixture
+def statements():
+    counter = StatementCounter()
+    engines = sync_engines()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", counter)
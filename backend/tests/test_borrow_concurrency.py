@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+from collections import Counter
+
+from sqlalchemy import func, select
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.models import MarketplaceItem, Reservation, User
+
+BORROWERS = 200
+
+def _make_users(count):
+    """Insert users directly and return bearer headers for each; tokens skip password hashing."""
+    prefix = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        users = [
+            User(username=f"{prefix}-{i}", email=f"{prefix}-{i}@example.com", full_name="Borrower", hashed_password="-")
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [(user.id, {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}) for user in users]
+
+def test_concurrent_borrows_have_exactly_one_winner(run):
+    (owner_id, owner), *borrowers = _make_users(BORROWERS + 1)
+    
+    async def body(client):
+        response = await client.post("/api/marketplace/", headers=owner, json={
+            "title": "Drill", "description": "d", "category": "tools", "item_type": "lend"
+        })
+        item_id = response.json()["id"]
+        responses = await asyncio.gather(*(
+            client.post(f"/api/marketplace/{item_id}/borrow", headers=headers, params={"days": 2})
+            for _, headers in borrowers
+        ))
+        return item_id, responses
+    
+    item_id, responses = run(body)
+    statuses = Counter(response.status_code for response in responses)
+    assert statuses[200] == 1, statuses
+    # Losers are told the item is taken, whether they lost the race or arrived after it
+    assert set(statuses) <= {200, 400, 409}, statuses
+    winner_id = next(user_id for (user_id, _), response in zip(borrowers, responses) if response.status_code == 200)
+    with SessionLocal() as db:
+        item = db.get(MarketplaceItem, item_id)
+        assert (item.availability, item.current_borrower_id) == (False, winner_id)
+        loans = db.execute(select(func.count()).select_from(Reservation).filter(Reservation.item_id == item_id)).scalar()
+        assert loans == 1
+
+def test_concurrent_returns_release_the_item_once(run):
+    (owner_id, owner), (borrower_id, borrower) = _make_users(2)
+    
+    async def body(client):
+        response = await client.post("/api/marketplace/", headers=owner, json={
+            "title": "Ladder", "description": "d", "category": "tools", "item_type": "lend"
+        })
+        item_id = response.json()["id"]
+        response = await client.post(f"/api/marketplace/{item_id}/borrow", headers=borrower, params={"days": 2})
+        assert response.status_code == 200, response.text
+        responses = await asyncio.gather(*(
+            client.post(f"/api/marketplace/{item_id}/return", headers=borrower) for _ in range(20)
+        ))
+        item = (await client.get(f"/api/marketplace/{item_id}", headers=borrower)).json()
+        return responses, item
+    
+    responses, item = run(body)
+    assert sum(response.status_code == 200 for response in responses) == 1
+    assert item["availability"] is True
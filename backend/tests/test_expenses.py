@@ -0,0 +1,44 @@
+async def _expense(client, creator, participant_ids, total=90):
+    response = await client.post("/api/expenses/", headers=creator, json={
+        "title": "Dinner", "total_amount": total, "category": "events", "participant_ids": participant_ids
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def test_cancelling_an_expense_clears_its_open_debts(run, login):
+    async def body(client):
+        creator_id, creator = await login(client)
+        debtor_id, debtor = await login(client)
+        other_id, other = await login(client)
+        expense_id = await _expense(client, creator, [creator_id, debtor_id, other_id])
+        await client.post(f"/api/expenses/{expense_id}/pay", headers=debtor, params={"amount": 10})
+        assert (await client.get("/api/expenses/balances", headers=creator)).json()["owed"] == 50
+        
+        response = await client.put(f"/api/expenses/{expense_id}", headers=creator, json={"status": "cancelled"})
+        assert response.status_code == 200, response.text
+        assert all(split["is_settled"] for split in response.json()["splits"])
+        # The payment already made stays recorded; nothing is owed any more
+        assert [split["amount_paid"] for split in response.json()["splits"] if split["user_id"] == debtor_id] == [10]
+        for headers in (creator, debtor, other):
+            balances = (await client.get("/api/expenses/balances", headers=headers)).json()
+            assert (balances["owes"], balances["owed"], balances["counterparties"]) == (0, 0, [])
+        assert (await client.get("/api/expenses/settle-plan", headers=creator)).json() == []
+        response = await client.post(f"/api/expenses/{expense_id}/pay", headers=other, params={"amount": 10})
+        assert response.status_code == 400
+    
+    run(body)
+
+def test_total_of_an_expense_with_splits_cannot_change(run, login):
+    async def body(client):
+        creator_id, creator = await login(client)
+        debtor_id, debtor = await login(client)
+        expense_id = await _expense(client, creator, [creator_id, debtor_id])
+        
+        response = await client.put(f"/api/expenses/{expense_id}", headers=creator, json={"total_amount": 120})
+        assert response.status_code == 400
+        response = await client.put(f"/api/expenses/{expense_id}", headers=creator, json={"total_amount": 90, "title": "Lunch"})
+        assert response.status_code == 200, response.text
+        assert (response.json()["title"], response.json()["total_amount"]) == ("Lunch", 90)
+        assert (await client.get("/api/expenses/balances", headers=debtor)).json()["owes"] == 45
+    
+    run(body)
@@ -0,0 +1,26 @@
+from app.geo import bounding_boxes
+
+def test_box_across_the_antimeridian_is_split():
+    boxes = bounding_boxes(0.0, 179.999, 1000)
+    assert len(boxes) == 2
+    (_, _, west_min, west_max), (_, _, east_min, east_max) = boxes
+    assert west_max == 180.0 and west_min < 179.999
+    assert east_min == -180.0 and -180.0 < east_max < -179.99
+    assert len(bounding_boxes(0.0, 10.0, 1000)) == 1
+
+def test_alerts_near_the_antimeridian_are_found_from_either_side(run, login):
+    async def body(client):
+        _, headers = await login(client)
+        response = await client.post("/api/alerts/", headers=headers, json={
+            "title": "Dateline", "description": "d", "alert_type": "safety", "location": "Taveuni",
+            "latitude": -16.8, "longitude": 179.9995
+        })
+        alert_id = response.json()["id"]
+        found = []
+        for near in ("-16.8,-179.9995", "-16.8,179.9995"):
+            response = await client.get("/api/alerts/", headers=headers, params={"near": near, "radius_m": 1000})
+            assert response.status_code == 200, response.text
+            found.append(alert_id in [alert["id"] for alert in response.json()])
+        return found
+    
+    assert run(body) == [True, True]
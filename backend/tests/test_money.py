@@ -0,0 +1,103 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from app.money import allocate, from_cents, to_cents
+
+# Generated cases per property; the seed keeps failures reproducible
+CASES = 2000
+
+@pytest.fixture
+def rng():
+    return random.Random(1234)
+
+def _random_weights(rng):
+    return [rng.choice([0, 1, 1, 2, 3, rng.randint(1, 10000)]) for _ in range(rng.randint(1, 60))]
+
+def test_allocate_sums_exactly(rng):
+    for _ in range(CASES):
+        total = rng.randint(0, 10 ** 9)
+        weights = _random_weights(rng)
+        if not any(weights):
+            weights[0] = 1
+        shares = allocate(total, weights)
+        assert sum(shares) == total, (total, weights)
+        assert len(shares) == len(weights)
+
+def test_allocate_shares_are_within_a_cent_of_exact(rng):
+    for _ in range(CASES):
+        total = rng.randint(0, 10 ** 7)
+        weights = _random_weights(rng)
+        if not any(weights):
+            weights[0] = 1
+        weight_total = sum(weights)
+        for share, weight in zip(allocate(total, weights), weights):
+            exact = Fraction(total * weight, weight_total)
+            assert exact - 1 < share < exact + 1, (total, weights)
+            if weight == 0:
+                assert share == 0
+
+def test_equal_allocation_differs_by_at_most_a_cent(rng):
+    for _ in range(CASES):
+        total = rng.randint(0, 10 ** 8)
+        shares = allocate(total, [1] * rng.randint(1, 1000))
+        assert sum(shares) == total
+        assert max(shares) - min(shares) <= 1
+        # Leftover cents go to the first participants
+        assert shares == sorted(shares, reverse=True)
+
+def test_allocate_is_deterministic(rng):
+    for _ in range(200):
+        total = rng.randint(0, 10 ** 6)
+        weights = _random_weights(rng) + [1]
+        assert allocate(total, weights) == allocate(total, list(weights))
+
+def test_allocate_rejects_zero_weights():
+    with pytest.raises(ValueError):
+        allocate(100, [0, 0])
+
+def test_cents_round_trip(rng):
+    for _ in range(CASES):
+        cents = rng.randint(0, 10 ** 10)
+        assert to_cents(from_cents(cents)) == cents
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(0.005) == 1
+
+def test_equal_split_expenses_sum_to_their_total(run, login, rng):
+    cases = [(round(rng.uniform(0.01, 100000), 2), rng.randint(1, 7)) for _ in range(15)]
+    
+    async def body(client):
+        users = [await login(client) for _ in range(7)]
+        creator = users[0][1]
+        for total, count in cases:
+            response = await client.post("/api/expenses/", headers=creator, json={
+                "title": "Split", "total_amount": total, "category": "events",
+                "participant_ids": [user_id for user_id, _ in users[:count]]
+            })
+            assert response.status_code == 200, response.text
+            owed = [to_cents(split["amount_owed"]) for split in response.json()["splits"]]
+            assert sum(owed) == to_cents(total), (total, owed)
+            assert max(owed) - min(owed) <= 1
+    
+    run(body)
+
+def test_non_finite_amounts_are_rejected(run, login):
+    async def body(client):
+        user_id, headers = await login(client)
+        expense = {"title": "Split", "total_amount": 90, "category": "events", "participant_ids": [user_id]}
+        response = await client.post("/api/expenses/", headers=headers, json=expense)
+        expense_id = response.json()["id"]
+        for amount in (float("nan"), float("inf"), float("-inf")):
+            response = await client.post("/api/expenses/", headers=headers, json={**expense, "total_amount": amount})
+            assert response.status_code == 422, response.text
+            response = await client.post("/api/expenses/", headers=headers, json={
+                **expense, "split_type": "custom", "custom_splits": [{"user_id": user_id, "amount_owed": amount}]
+            })
+            assert response.status_code == 422, response.text
+            response = await client.put(f"/api/expenses/{expense_id}", headers=headers, json={"total_amount": amount})
+            assert response.status_code == 422, response.text
+            response = await client.post(f"/api/expenses/{expense_id}/pay", headers=headers, params={"amount": str(amount)})
+            assert response.status_code == 422, response.text
+    
+    run(body)
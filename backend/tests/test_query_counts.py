@@ -0,0 +1,65 @@
+import pytest
+
+# Most statements a list request may run, whatever the page size
+MAX_STATEMENTS = 6
+
+ROWS = 12
+
+LIST_ENDPOINTS = [
+    "/api/ideas/",
+    "/api/alerts/",
+    "/api/alerts/active",
+    "/api/marketplace/",
+    "/api/marketplace/my-items",
+    "/api/marketplace/borrowed",
+    "/api/expenses/",
+    "/api/expenses/my-splits",
+    "/api/expenses/pending-payments",
+    "/api/users/",
+    "/api/dashboard/",
+]
+
+async def _seed(client, login):
+    """Create ROWS rows of every kind, each by a different user, all involving the viewer."""
+    viewer_id, viewer = await login(client)
+    for i in range(ROWS):
+        user_id, headers = await login(client)
+        await client.post("/api/ideas/", headers=headers, json={
+            "title": f"Idea {i}", "description": "d", "category": "community"
+        })
+        await client.post("/api/alerts/", headers=headers, json={
+            "title": f"Alert {i}", "description": "d", "alert_type": "theft", "location": "Main road"
+        })
+        response = await client.post("/api/marketplace/", headers=headers, json={
+            "title": f"Item {i}", "description": "d", "category": "tools", "item_type": "lend"
+        })
+        if i % 2:
+            await client.post(f"/api/marketplace/{response.json()['id']}/borrow", headers=viewer, params={"days": 3})
+        await client.post("/api/expenses/", headers=headers, json={
+            "title": f"Expense {i}", "total_amount": 30, "category": "events", "participant_ids": [user_id, viewer_id]
+        })
+        await client.post("/api/marketplace/", headers=viewer, json={
+            "title": f"My item {i}", "description": "d", "category": "tools", "item_type": "lend"
+        })
+    return viewer
+
+@pytest.fixture(scope="module")
+def viewer(run, login):
+    return run(lambda client: _seed(client, login))
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+def test_list_endpoint_statement_count_is_bounded(run, statements, viewer, path):
+    async def body(client):
+        counts = {}
+        for limit in (2, ROWS):
+            # Warm the token cache so only the endpoint's own queries are counted
+            await client.get("/api/users/me", headers=viewer)
+            before = statements.count
+            response = await client.get(path, headers=viewer, params={"limit": limit})
+            assert response.status_code == 200, response.text
+            counts[limit] = statements.count - before
+        return counts
+    
+    counts = run(body)
+    assert counts[ROWS] == counts[2], f"{path} ran more statements for a bigger page: {counts}"
+    assert counts[ROWS] <= MAX_STATEMENTS, f"{path} ran {counts[ROWS]} statements"
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine, sync_engines
+
+# Endpoint, query parameters and the index its main query must use
+INDEXED_QUERIES = [
+    ("/api/ideas/", {}, "ix_ideas_created_at_id"),
+    ("/api/ideas/", {"category": "community"}, "ix_ideas_category_created_at_id"),
+    ("/api/alerts/", {}, "ix_alerts_created_at_id"),
+    ("/api/alerts/", {"severity": "high"}, "ix_alerts_severity_created_at_id"),
+    ("/api/alerts/active", {}, "ix_alerts_status_created_at_id"),
+    ("/api/marketplace/", {}, "ix_marketplace_items_availability_created_at_id"),
+    ("/api/marketplace/my-items", {}, "ix_marketplace_items_owner_id_created_at_id"),
+    ("/api/marketplace/borrowed", {}, "ix_marketplace_items_current_borrower_id_availability"),
+    ("/api/marketplace/", {"free_from": "2030-01-01T00:00:00", "free_to": "2030-01-02T00:00:00"},
+     "ix_reservations_item_id_starts_at_ends_at"),
+    ("/api/expenses/", {}, "ix_expenses_created_at_id"),
+    ("/api/expenses/", {}, "ix_expense_splits_expense_id_user_id"),
+    ("/api/expenses/my-splits", {}, "ix_expense_splits_user_id_is_settled"),
+    ("/api/expenses/pending-payments", {}, "ix_expense_splits_user_id_is_settled"),
+    ("/api/users/", {}, "ix_users_created_at_id"),
+]
+
+# "SCAN <table>" with no index reads every row
+FULL_SCAN = re.compile(r"^SCAN \w+$")
+
+@pytest.fixture
+def selects():
+    """SELECT statements and their parameters, as sent to any engine."""
+    captured = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    
+    engines = sync_engines()
+    for _engine in engines:
+        event.listen(_engine, "before_cursor_execute", capture)
+    yield captured
+    for _engine in engines:
+        event.remove(_engine, "before_cursor_execute", capture)
+
+def _plans(statements):
+    with engine.connect() as conn:
+        return [
+            [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            for statement, parameters in statements
+        ]
+
+@pytest.mark.parametrize("path,params,index", INDEXED_QUERIES)
+def test_list_query_uses_index(run, login, selects, path, params, index):
+    async def body(client):
+        user_id, headers = await login(client)
+        # Related rows are only loaded when there is a parent row
+        await client.post("/api/expenses/", headers=headers, json={
+            "title": "Rent", "total_amount": 10, "category": "utilities", "participant_ids": [user_id]
+        })
+        selects.clear()
+        response = await client.get(path, headers=headers, params=params)
+        assert response.status_code == 200, response.text
+    
+    run(body)
+    plans = _plans(selects)
+    steps = [step for plan in plans for step in plan]
+    assert not [step for step in steps if FULL_SCAN.match(step)], f"{path} scans a whole table: {plans}"
+    assert any(index in step for step in steps), f"{path} does not use {index}: {plans}"
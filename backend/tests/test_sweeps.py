@@ -0,0 +1,52 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import sweeps
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models import Expense, MarketplaceItem, User
+
+def _owner_id():
+    with SessionLocal() as db:
+        name = f"sweep-{uuid.uuid4().hex[:8]}"
+        user = User(username=name, email=f"{name}@example.com", full_name="Sweeper", hashed_password="-")
+        db.add(user)
+        db.commit()
+        return user.id
+
+def test_sweep_leaves_rows_changed_after_they_were_selected(monkeypatch):
+    owner_id = _owner_id()
+    past = datetime.utcnow() - timedelta(days=1)
+    with SessionLocal() as db:
+        item = MarketplaceItem(title="Drill", description="d", category="tools", item_type="lend", owner_id=owner_id,
+                               availability=False, current_borrower_id=owner_id, return_by=past)
+        expense = Expense(title="Rent", total_amount_cents=100, category="utilities", created_by_id=owner_id,
+                          due_date=past)
+        db.add_all([item, expense])
+        db.commit()
+        item_id, expense_id = item.id, expense.id
+    
+    async def racing_sweep(select_ids, apply):
+        # The item is returned and the expense settled between the SELECT and the UPDATE
+        async with AsyncSessionLocal() as db:
+            ids = (await db.execute(select_ids)).scalars().all()
+            await db.execute(update(MarketplaceItem).where(MarketplaceItem.id == item_id).values(availability=True))
+            await db.execute(update(Expense).where(Expense.id == expense_id).values(status="settled"))
+            await apply(db, ids)
+            await db.commit()
+        return len(ids)
+    
+    async def body():
+        try:
+            await sweeps.mark_overdue_items()
+            await sweeps.mark_overdue_expenses()
+        finally:
+            await async_engine.dispose()
+    
+    monkeypatch.setattr(sweeps, "_sweep", racing_sweep)
+    asyncio.run(body())
+    with SessionLocal() as db:
+        assert db.get(MarketplaceItem, item_id).overdue_at is None
+        assert db.get(Expense, expense_id).overdue_at is None
@@ -0,0 +1,40 @@
+import time
+import uuid
+
+from app.auth import _user_snapshot, user_cache
+from app.database import SessionLocal
+from app.models import User
+
+def _cache_user(user):
+    key = (user.username, time.time() + 60)
+    user_cache.set(key, _user_snapshot(user), ttl=60)
+    return key
+
+def test_updated_user_is_evicted_after_commit():
+    name = f"cached-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        user = User(username=name, email=f"{name}@example.com", full_name="Before", hashed_password="-")
+        db.add(user)
+        db.commit()
+        
+        user.full_name = "After"
+        db.flush()
+        # A concurrent request still sees the committed row and caches it
+        with SessionLocal() as other:
+            key = _cache_user(other.get(User, user.id))
+        db.commit()
+        assert user_cache.get(key) is None
+
+def test_rolled_back_update_keeps_the_cache():
+    name = f"cached-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        user = User(username=name, email=f"{name}@example.com", full_name="Before", hashed_password="-")
+        db.add(user)
+        db.commit()
+        key = _cache_user(user)
+        
+        user.full_name = "After"
+        db.flush()
+        db.rollback()
+        db.commit()
+        assert user_cache.get(key)["full_name"] == "Before"
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.sql import Update
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import Idea
+from app.routers import ideas
+from app.vote_buffer import VoteBuffer, rebuild_counts_statement
+
+VOTERS = 10
+ROUNDS = 20
+
+# Sustained rate one hot idea must handle; far below what either path reaches
+# locally, so only a serialization regression fails it
+MIN_VOTES_PER_SECOND = 30
+
+@pytest.mark.parametrize("buffered", [False, True], ids=["direct", "buffered"])
+def test_hot_idea_sustains_concurrent_votes(run, login, monkeypatch, buffered):
+    buffer = VoteBuffer(50) if buffered else None
+    monkeypatch.setattr(ideas, "vote_buffer", buffer)
+    
+    async def body(client):
+        author_id, author = await login(client)
+        response = await client.post("/api/ideas/", headers=author, json={
+            "title": "Hot idea", "description": "d", "category": "community"
+        })
+        idea_id = response.json()["id"]
+        voters = [(await login(client))[1] for _ in range(VOTERS)]
+        if buffer is not None:
+            buffer.start()
+        
+        async def vote(headers, round_):
+            response = await client.post(
+                f"/api/ideas/{idea_id}/vote", headers=headers, params={"vote_type": "up" if round_ % 2 else "down"}
+            )
+            assert response.status_code == 200, response.text
+        
+        started = time.perf_counter()
+        for round_ in range(ROUNDS):
+            await asyncio.gather(*(vote(headers, round_) for headers in voters))
+        elapsed = time.perf_counter() - started
+        if buffer is not None:
+            await buffer.stop()
+        response = await client.get(f"/api/ideas/{idea_id}", headers=author)
+        return elapsed, response.json()
+    
+    elapsed, idea = run(body)
+    rate = VOTERS * ROUNDS / elapsed
+    # The last round votes up, so each voter ends with one up vote
+    assert (idea["votes_up"], idea["votes_down"]) == (VOTERS, 0)
+    assert rate >= MIN_VOTES_PER_SECOND, f"{rate:.0f} votes/s"
+
+def test_vote_counters_rebuild_from_vote_rows(run, login):
+    async def body(client):
+        author_id, author = await login(client)
+        response = await client.post("/api/ideas/", headers=author, json={
+            "title": "Rebuilt idea", "description": "d", "category": "community"
+        })
+        idea_id = response.json()["id"]
+        for vote_type in ("up", "up", "down"):
+            _, headers = await login(client)
+            await client.post(f"/api/ideas/{idea_id}/vote", headers=headers, params={"vote_type": vote_type})
+        return idea_id
+    
+    idea_id = run(body)
+    with SessionLocal() as db:
+        db.execute(update(Idea).where(Idea.id == idea_id).values(votes_up=0, votes_down=7))
+        db.execute(rebuild_counts_statement())
+        db.commit()
+        idea = db.get(Idea, idea_id)
+        assert (idea.votes_up, idea.votes_down) == (2, 1)
+
+def test_vote_change_gives_up_when_it_keeps_losing(run, login):
+    async def body(client):
+        author_id, author = await login(client)
+        response = await client.post("/api/ideas/", headers=author, json={
+            "title": "Contested idea", "description": "d", "category": "community"
+        })
+        idea_id = response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/vote", headers=author, params={"vote_type": "up"})
+        
+        async with AsyncSessionLocal() as db:
+            attempts = []
+            execute = db.execute
+            
+            async def losing_execute(statement, *args, **kwargs):
+                # Every vote change finds the row already changed by someone else
+                if isinstance(statement, Update):
+                    attempts.append(statement)
+                    return SimpleNamespace(rowcount=0)
+                return await execute(statement, *args, **kwargs)
+            
+            db.execute = losing_execute
+            with pytest.raises(HTTPException) as raised:
+                await ideas._record_vote(db, idea_id, author_id, "down")
+        return raised.value.status_code, len(attempts)
+    
+    assert run(body) == (409, ideas.VOTE_ATTEMPTS)
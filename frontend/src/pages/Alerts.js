@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
   Container,
   Grid,
@@ -30,7 +30,7 @@ import {
 } from '@mui/icons-material';
 import { useForm } from 'react-hook-form';
 import { useQuery, useMutation, useQueryClient } from 'react-query';
-import { alertsApi } from '../services/api';
+import { alertsApi, subscribeToAlerts } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import { format } from 'date-fns';
 
@@ -47,7 +47,17 @@ const Alerts = () => {
     formState: { errors },
   } = useForm();
 
-  const { data: alerts, isLoading } = useQuery('alerts', () => alertsApi.getAll());
+  // Alerts are pushed by the server; the slow poll only backs up a stream that
+  // missed events or could not reconnect
+  const { data: alerts, isLoading } = useQuery('alerts', () => alertsApi.getAll(), {
+    staleTime: 30000,
+    refetchInterval: 60000,
+  });
+
+  useEffect(() => {
+    const refresh = () => queryClient.invalidateQueries('alerts');
+    return subscribeToAlerts(refresh, refresh);
+  }, [queryClient]);
 
   const createMutation = useMutation(alertsApi.create, {
     onSuccess: () => {
@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
 import {
   Container,
@@ -26,19 +26,27 @@ import {
   Add,
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import { useQuery } from 'react-query';
+import { useQuery, useQueryClient } from 'react-query';
 import { useAuth } from '../contexts/AuthContext';
-import { ideasApi, alertsApi, marketplaceApi, expensesApi } from '../services/api';
+import { dashboardApi, subscribeToAlerts } from '../services/api';
 
 const Dashboard = () => {
   const { t } = useTranslation();
   const navigate = useNavigate();
   const { user } = useAuth();
+  const queryClient = useQueryClient();
 
-  const { data: ideas } = useQuery('recent-ideas', () => ideasApi.getAll({ limit: 5 }));
-  const { data: activeAlerts } = useQuery('active-alerts', () => alertsApi.getActive({ limit: 5 }));
-  const { data: marketplaceItems } = useQuery('marketplace-items', () => marketplaceApi.getAll({ limit: 5 }));
-  const { data: expenses } = useQuery('recent-expenses', () => expensesApi.getAll({ limit: 5, my_expenses_only: true }));
+  // One round trip for all four sections; refetches revalidate with the ETag
+  const { data: dashboard } = useQuery('dashboard', () => dashboardApi.get());
+  const ideas = dashboard?.data?.ideas;
+  const activeAlerts = dashboard?.data?.active_alerts;
+  const marketplaceItems = dashboard?.data?.marketplace_items;
+  const expenses = dashboard?.data?.expenses;
+
+  useEffect(
+    () => subscribeToAlerts(() => queryClient.invalidateQueries('dashboard')),
+    [queryClient]
+  );
 
   const quickActions = [
     {
@@ -74,28 +82,28 @@ const Dashboard = () => {
   const stats = [
     {
       title: 'Active Ideas',
-      value: ideas?.data?.length || 0,
+      value: ideas?.length || 0,
       icon: <TrendingUp />,
       color: '#10b981',
       progress: 75,
     },
     {
       title: 'Safety Alerts',
-      value: activeAlerts?.data?.length || 0,
+      value: activeAlerts?.length || 0,
       icon: <Notifications />,
       color: '#ef4444',
       progress: 25,
     },
     {
       title: 'Items Available',
-      value: marketplaceItems?.data?.length || 0,
+      value: marketplaceItems?.length || 0,
       icon: <Store />,
       color: '#3b82f6',
       progress: 60,
     },
     {
       title: 'Pending Expenses',
-      value: expenses?.data?.filter(e => e.status === 'pending').length || 0,
+      value: expenses?.filter(e => e.status === 'pending').length || 0,
       icon: <Assignment />,
       color: '#8b5cf6',
       progress: 40,
@@ -303,7 +311,7 @@ const Dashboard = () => {
                     <Add />
                   </IconButton>
                 </Box>
-                {ideas?.data?.slice(0, 3).map((idea) => (
+                {ideas?.slice(0, 3).map((idea) => (
                   <Box key={idea.id} sx={{ mb: 3, pb: 2, borderBottom: '1px solid rgba(0,0,0,0.1)' }}>
                     <Typography variant="body1" gutterBottom sx={{ fontWeight: 500 }}>
                       {idea.title}
@@ -382,7 +390,7 @@ const Dashboard = () => {
                     <Add />
                   </IconButton>
                 </Box>
-                {activeAlerts?.data?.slice(0, 3).map((alert) => (
+                {activeAlerts?.slice(0, 3).map((alert) => (
                   <Box key={alert.id} sx={{ mb: 3, pb: 2, borderBottom: '1px solid rgba(0,0,0,0.1)' }}>
                     <Typography variant="body1" gutterBottom sx={{ fontWeight: 500 }}>
                       {alert.title}
@@ -15,6 +15,7 @@ export const ideasApi = {
   update: (id, data) => api.put(`/api/ideas/${id}`, data),
   delete: (id) => api.delete(`/api/ideas/${id}`),
   vote: (id, voteType) => api.post(`/api/ideas/${id}/vote?vote_type=${voteType}`),
+  retractVote: (id) => api.delete(`/api/ideas/${id}/vote`),
 };
 
 // Alerts API
@@ -28,6 +29,37 @@ export const alertsApi = {
   delete: (id) => api.delete(`/api/alerts/${id}`),
 };
 
+// Alert change stream (server-sent events); returns an unsubscribe function.
+// onOpen runs on every (re)connect so callers can catch up on missed events.
+export const subscribeToAlerts = (onEvent, onOpen) => {
+  let source;
+  let retry;
+  const connect = () => {
+    const token = localStorage.getItem('token');
+    source = new EventSource(
+      `${api.defaults.baseURL}/api/alerts/stream?token=${encodeURIComponent(token)}`
+    );
+    ['alert_created', 'alert_updated', 'alert_resolved', 'alert_deleted'].forEach((type) => {
+      source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+    });
+    if (onOpen) {
+      source.addEventListener('open', onOpen);
+    }
+    // The browser gives up after an error response such as a 401 from an expired
+    // token, so reconnect ourselves with whatever token is current by then
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED) {
+        retry = setTimeout(connect, 5000);
+      }
+    });
+  };
+  connect();
+  return () => {
+    clearTimeout(retry);
+    source.close();
+  };
+};
+
 // Marketplace API
 export const marketplaceApi = {
   getAll: (params = {}) => api.get('/api/marketplace/', { params }),
@@ -38,6 +70,9 @@ export const marketplaceApi = {
   update: (id, data) => api.put(`/api/marketplace/${id}`, data),
   borrow: (id, days) => api.post(`/api/marketplace/${id}/borrow?days=${days}`),
   return: (id) => api.post(`/api/marketplace/${id}/return`),
+  getReservations: (id) => api.get(`/api/marketplace/${id}/reservations`),
+  reserve: (id, data) => api.post(`/api/marketplace/${id}/reservations`, data),
+  cancelReservation: (reservationId) => api.delete(`/api/marketplace/reservations/${reservationId}`),
   delete: (id) => api.delete(`/api/marketplace/${id}`),
 };
 
@@ -46,6 +81,8 @@ export const expensesApi = {
   getAll: (params = {}) => api.get('/api/expenses/', { params }),
   getMySplits: () => api.get('/api/expenses/my-splits'),
   getPendingPayments: () => api.get('/api/expenses/pending-payments'),
+  getBalances: () => api.get('/api/expenses/balances'),
+  getSettlePlan: (params = {}) => api.get('/api/expenses/settle-plan', { params }),
   getById: (id) => api.get(`/api/expenses/${id}`),
   create: (data) => api.post('/api/expenses/', data),
   update: (id, data) => api.put(`/api/expenses/${id}`, data),
@@ -58,4 +95,8 @@ export const usersApi = {
   getAll: (params = {}) => api.get('/api/users/', { params }),
   getById: (id) => api.get(`/api/users/${id}`),
   updateProfile: (data) => api.put('/api/users/me', data),
-};
\ No newline at end of file
+};
+// Dashboard API
+export const dashboardApi = {
+  get: () => api.get('/api/dashboard/'),
+};